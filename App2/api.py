@@ -0,0 +1,211 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .facets import apply_catalog_filters, catalog_filters
+from .models import Course, Enrollment, Progress
+from .outline import get_outline
+from .pagecache import current_generations, normalized_query
+from .pagination import KeysetPaginator
+from .search import get_search_backend
+from .verification import BULK_VERIFY_LIMIT, verify, verify_many
+
+
+# Read-only JSON API
+# Rows come straight from .values() projections and are shaped by the to_*
+# functions below, so no model instances are built. Public responses are cached
+# under the page cache generations (see App2/pagecache.py); the catalog export
+# is streamed instead.
+API_KEY = 'api:{endpoint}:{generations}:{digest}'
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 2000
+
+COURSE_FIELDS = [
+    'id', 'title', 'slug', 'short_description', 'thumbnail', 'course_type', 'price', 'category', 'level',
+    'duration_hours', 'instructor', 'total_modules', 'total_lessons', 'total_duration_minutes',
+    'rating_count', 'rating_sum', 'created_at',
+]
+COURSE_DETAIL_FIELDS = COURSE_FIELDS + [
+    'description', 'cover_image', 'prerequisites', 'learning_objectives', 'outline_version',
+    'ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5',
+]
+
+
+def media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+def to_course(row):
+    rating_count, rating_sum = row.pop('rating_count'), row.pop('rating_sum')
+    row.pop('search_rank', None)
+    row['price'] = float(row['price'])
+    row['thumbnail'] = media_url(row['thumbnail'])
+    row['rating'] = {
+        'count': rating_count,
+        'average': round(rating_sum / rating_count, 2) if rating_count else None,
+    }
+    return row
+
+
+def to_course_detail(row):
+    histogram = {stars: row.pop(f'ratings_{stars}') for stars in range(5, 0, -1)}
+    outline = get_outline(row['id'], row.pop('outline_version'))
+    course = to_course(row)
+    course['cover_image'] = media_url(course['cover_image'])
+    course['rating']['histogram'] = histogram
+    course['modules'] = [
+        {
+            **{field: module[field] for field in ('id', 'title', 'description', 'order', 'lesson_count',
+                                                  'duration_minutes')},
+            'lessons': [
+                {field: lesson[field] for field in ('id', 'title', 'content_type', 'duration_minutes', 'order',
+                                                     'is_preview')}
+                for lesson in module['lessons']
+            ],
+        }
+        for module in outline['modules']
+    ]
+    return course
+
+
+def json_response(data, **kwargs):
+    return JsonResponse(data, encoder=DjangoJSONEncoder, **kwargs)
+
+
+def cached_json(endpoint, request, build):
+    """Serialized ``build()`` cached per normalized query and content generation"""
+    timeout = getattr(settings, 'API_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return json_response(build())
+    digest = hashlib.md5(f'{request.path}?{normalized_query(request.GET)}'.encode()).hexdigest()
+    key = API_KEY.format(endpoint=endpoint, generations=current_generations(), digest=digest)
+    content = cache.get(key)
+    if content is None:
+        content = json.dumps(build(), cls=DjangoJSONEncoder).encode()
+        cache.set(key, content, timeout)
+    return HttpResponse(content, content_type='application/json')
+
+
+def catalog_queryset(params):
+    queryset = apply_catalog_filters(Course.objects.filter(is_active=True), catalog_filters(params))
+    search = params.get('search', '').strip()
+    if search:
+        return get_search_backend().search(queryset, search), ['-search_rank', '-id']
+    return queryset, ['-created_at', '-id']
+
+
+def page_size(params):
+    try:
+        return min(max(int(params.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return API_PAGE_SIZE
+
+
+@require_GET
+def course_list(request):
+    """Catalog page: same filters and search as the HTML catalog, cursor paged"""
+    def build():
+        queryset, ordering = catalog_queryset(request.GET)
+        fields = COURSE_FIELDS + (['search_rank'] if ordering[0] == '-search_rank' else [])
+        page = KeysetPaginator(
+            queryset.values(*fields), ordering, page_size(request.GET), count_limit=1000,
+        ).page(request.GET.get('cursor'))
+        return {
+            'results': [to_course(row) for row in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+            'total': page.total,
+            'total_exact': page.total_exact,
+        }
+    return cached_json('courses', request, build)
+
+
+@require_GET
+def course_export(request):
+    """Every matching course as one JSON array, streamed in chunks"""
+    queryset, ordering = catalog_queryset(request.GET)
+
+    def rows():
+        yield '['
+        for number, row in enumerate(queryset.order_by(*ordering).values(*COURSE_FIELDS).iterator(
+            chunk_size=EXPORT_CHUNK_SIZE,
+        )):
+            yield (',' if number else '') + json.dumps(to_course(row), cls=DjangoJSONEncoder)
+        yield ']'
+
+    response = StreamingHttpResponse(rows(), content_type='application/json')
+    response['Content-Disposition'] = 'attachment; filename="courses.json"'
+    return response
+
+
+@require_GET
+def course_detail(request, pk):
+    """One active course with its rating histogram and cached outline"""
+    row = Course.objects.filter(pk=pk, is_active=True).values(*COURSE_DETAIL_FIELDS).first()
+    if row is None:
+        return json_response({'error': 'Not found'}, status=404)
+    return cached_json('course', request, lambda: to_course_detail(row))
+
+
+@require_GET
+def my_enrollments(request):
+    """The signed-in learner's enrollments with progress and completed lesson ids"""
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Authentication required'}, status=401)
+
+    enrollments = list(Enrollment.objects.filter(user=request.user).order_by('-enrollment_date').values(
+        'id', 'course_id', 'course__title', 'course__slug', 'course__total_lessons', 'status',
+        'progress_percentage', 'enrollment_date', 'completion_date', 'certificate_issued',
+    ))
+    completed = {}
+    for enrollment_id, lesson_id in Progress.objects.filter(
+        enrollment__user=request.user, is_completed=True,
+    ).order_by('lesson_id').values_list('enrollment_id', 'lesson_id'):
+        completed.setdefault(enrollment_id, []).append(lesson_id)
+
+    results = [
+        {
+            'id': row['id'],
+            'course': {'id': row['course_id'], 'title': row['course__title'], 'slug': row['course__slug']},
+            'status': row['status'],
+            'progress_percentage': float(row['progress_percentage']),
+            'total_lessons': row['course__total_lessons'],
+            'completed_lessons': completed.get(row['id'], []),
+            'enrollment_date': row['enrollment_date'],
+            'completion_date': row['completion_date'],
+            'certificate_issued': row['certificate_issued'],
+        }
+        for row in enrollments
+    ]
+    response = json_response({'results': results})
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@require_GET
+def certificate_verify(request, certificate_id):
+    """Whether a certificate id is genuine, with its holder and course"""
+    result = verify(certificate_id)
+    return json_response(result, status=200 if result['valid'] else 404)
+
+
+@csrf_exempt
+@require_POST
+def certificate_verify_bulk(request):
+    """Verify many ids at once: POST {"ids": [...]} with up to BULK_VERIFY_LIMIT ids"""
+    try:
+        ids = json.loads(request.body)['ids']
+    except (ValueError, KeyError, TypeError):
+        return json_response({'error': 'Expected JSON like {"ids": [...]}'}, status=400)
+    if not isinstance(ids, list) or not all(isinstance(certificate_id, str) for certificate_id in ids):
+        return json_response({'error': 'ids must be a list of strings'}, status=400)
+    if len(ids) > BULK_VERIFY_LIMIT:
+        return json_response({'error': f'At most {BULK_VERIFY_LIMIT} ids per request'}, status=400)
+    return json_response({'results': verify_many(ids)})
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class App2Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'App2'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
@@ -0,0 +1,175 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import repeat
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+
+from .jobs import enqueue
+from .models import Certificate, Enrollment
+
+
+# Certificate rendering
+# Certificates are drawn with Pillow from the values below and stored once per
+# certificate_id and template version as certificates/<id>.v<version>.<ext>;
+# after that the stored file is served. Bumping CERTIFICATE_TEMPLATE_VERSION
+# (e.g. after a branding change) makes every certificate render again on next
+# use, or in bulk with `manage.py render_certificates`, which spreads the
+# drawing over a process pool.
+FORMATS = ('pdf', 'png')
+PAGE_SIZE = (2000, 1414)  # A4 landscape
+RESOLUTION = 170.0  # dpi, so the PDF page is A4
+
+BACKGROUND = (255, 255, 255)
+BORDER = (0, 170, 200)
+ACCENT = (200, 0, 120)
+INK = (30, 30, 40)
+MUTED = (110, 110, 120)
+
+# (key, font file, size, colour, y position); text is centred horizontally
+LAYOUT = [
+    ('brand', 'DejaVuSans-Bold.ttf', 48, BORDER, 170),
+    ('title', 'DejaVuSerif-Bold.ttf', 110, INK, 300),
+    ('subtitle', 'DejaVuSans.ttf', 44, MUTED, 440),
+    ('certifies', 'DejaVuSans.ttf', 40, MUTED, 560),
+    ('name', 'DejaVuSerif-Bold.ttf', 96, ACCENT, 640),
+    ('completed', 'DejaVuSans.ttf', 40, MUTED, 790),
+    ('course', 'DejaVuSerif-Bold.ttf', 64, INK, 860),
+    ('date', 'DejaVuSans.ttf', 36, MUTED, 1010),
+    ('reference', 'DejaVuSansMono.ttf', 28, MUTED, 1230),
+]
+
+
+def template_version():
+    return getattr(settings, 'CERTIFICATE_TEMPLATE_VERSION', 1)
+
+
+def certificate_name(certificate_id, extension, version=None):
+    return f'certificates/{certificate_id}.v{version or template_version()}.{extension}'
+
+
+def certificate_rows(queryset):
+    """Everything drawn on each certificate, straight from a values() query"""
+    return queryset.values(
+        'id', 'certificate_id', 'certificate_file', 'enrollment__user__username', 'enrollment__user__first_name',
+        'enrollment__user__last_name', 'enrollment__course__title', 'enrollment__completion_date', 'issued_date',
+    )
+
+
+def certificate_text(row):
+    name = f"{row['enrollment__user__first_name']} {row['enrollment__user__last_name']}".strip()
+    completed_on = row['enrollment__completion_date'] or row['issued_date']
+    return {
+        'brand': 'FUTURE BOUND TECH',
+        'title': 'CERTIFICATE',
+        'subtitle': 'OF COMPLETION',
+        'certifies': 'This is to certify that',
+        'name': name or row['enrollment__user__username'],
+        'completed': 'has successfully completed the course',
+        'course': row['enrollment__course__title'],
+        'date': f"Completed on {timezone.localtime(completed_on):%B %d, %Y}",
+        'reference': f"Certificate ID: {row['certificate_id']}",
+    }
+
+
+def load_font(filename, size):
+    try:
+        return ImageFont.truetype(filename, size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def fit_font(draw, text, filename, size, width):
+    """Largest font no bigger than ``size`` that fits ``text`` within ``width``"""
+    font = load_font(filename, size)
+    while size > 16 and draw.textlength(text, font=font) > width:
+        size -= 4
+        font = load_font(filename, size)
+    return font
+
+
+def render_certificate(text):
+    """Draw a certificate; returns ``{extension: bytes}`` for every format"""
+    image = Image.new('RGB', PAGE_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    width, height = PAGE_SIZE
+    draw.rectangle([40, 40, width - 41, height - 41], outline=BORDER, width=12)
+    draw.rectangle([80, 80, width - 81, height - 81], outline=ACCENT, width=3)
+    draw.line([width / 2 - 300, 1150, width / 2 + 300, 1150], fill=BORDER, width=3)
+
+    for key, filename, size, colour, y in LAYOUT:
+        font = fit_font(draw, text[key], filename, size, width - 320)
+        draw.text((width / 2, y), text[key], font=font, fill=colour, anchor='ma')
+
+    files = {}
+    for extension in FORMATS:
+        buffer = BytesIO()
+        if extension == 'pdf':
+            image.save(buffer, 'PDF', resolution=RESOLUTION)
+        else:
+            image.save(buffer, 'PNG', optimize=True)
+        files[extension] = buffer.getvalue()
+    return files
+
+
+def store_certificate(row, version=None, force=False):
+    """Render and store one certificate's files unless they exist.
+
+    Returns ``(certificate_id, PDF name)``.
+    """
+    names = {extension: certificate_name(row['certificate_id'], extension, version) for extension in FORMATS}
+    if force or not all(default_storage.exists(name) for name in names.values()):
+        for extension, content in render_certificate(certificate_text(row)).items():
+            if default_storage.exists(names[extension]):
+                default_storage.delete(names[extension])
+            default_storage.save(names[extension], ContentFile(content))
+    return row['certificate_id'], names['pdf']
+
+
+def stored_certificate(certificate, extension):
+    """Name of a certificate's stored file, rendering it first if needed"""
+    name = certificate_name(certificate.certificate_id, extension)
+    if not default_storage.exists(name):
+        row = certificate_rows(Certificate.objects.filter(pk=certificate.pk)).get()
+        _, pdf_name = store_certificate(row)
+        record_files({certificate.certificate_id: pdf_name})
+    return name
+
+
+def record_files(pdf_names):
+    """Point certificate_file at freshly stored PDFs ({certificate_id: name})"""
+    for certificate_id, name in pdf_names.items():
+        Certificate.objects.filter(certificate_id=certificate_id).exclude(certificate_file=name).update(
+            certificate_file=name,
+        )
+
+
+def issue_certificate(enrollment):
+    """Create the certificate for a completed enrollment and queue its rendering"""
+    certificate, created = Certificate.objects.get_or_create(enrollment_id=enrollment.pk)
+    Enrollment.objects.filter(pk=enrollment.pk).update(certificate_issued=True)
+    enrollment.certificate_issued = True
+    if created:
+        enqueue('render_certificate', {'certificate_pk': certificate.pk})
+    return certificate
+
+
+def render_in_pool(rows, processes=None, chunksize=50, force=False):
+    """Store certificates for a list of rows across a process pool.
+
+    Yields ``(certificate_id, pdf name)`` as results come in. Rendering is CPU
+    bound, so threads would share one core. Workers only touch storage and the
+    caller records the results, so ``rows`` must be fetched beforehand.
+    """
+    # Forked workers must not inherit open database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=django.setup) as pool:
+        yield from pool.map(
+            store_certificate, rows, repeat(template_version()), repeat(force), chunksize=chunksize,
+        )
@@ -0,0 +1,73 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Max, OuterRef, Subquery
+
+from .models import CacheGeneration, Course, Enrollment, Review
+
+
+# ETags for conditional GETs
+# Each function is an etag_func for django.views.decorators.http.condition: it
+# reads only the version columns a page depends on, so a matching If-None-Match
+# gets a 304 before the view queries anything or renders a template. No
+# Last-Modified is sent: outline and rating changes don't touch any timestamp.
+def make_etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def visitor_parts(request):
+    """What differs between visitors on the same URL.
+
+    The CSRF cookie is included because pages embed tokens derived from it.
+    Returns None while flash messages are pending, since a 304 would hide them;
+    base.html renders, and so clears, them on the next full response.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    user_id = request.user.pk if request.user.is_authenticated else 0
+    return [user_id, request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')]
+
+
+def course_detail_etag(request, pk):
+    visitor = visitor_parts(request)
+    if visitor is None:
+        return None
+    latest_review = Review.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(
+        latest=Max('updated_at'),
+    ).values('latest')
+    course = Course.objects.filter(pk=pk).annotate(reviews_updated_at=Subquery(latest_review)).values_list(
+        'updated_at', 'outline_version', 'rating_count', 'rating_sum', 'reviews_updated_at',
+    ).first()
+    if course is None:
+        return None
+    enrollment = None
+    if request.user.is_authenticated:
+        enrollment = Enrollment.objects.filter(user=request.user, course_id=pk).values_list(
+            'pk', 'status', 'progress_version',
+        ).first()
+    return make_etag('course', pk, *course, enrollment, *visitor, request.GET.urlencode())
+
+
+def course_list_etag(request):
+    visitor = visitor_parts(request)
+    if visitor is None:
+        return None
+    # The catalog shows every course and its rating, so it follows both generations
+    generations = dict(CacheGeneration.objects.filter(name__in=['course', 'review']).values_list('name', 'value'))
+    return make_etag('catalog', generations.get('course'), generations.get('review'), *visitor,
+                     request.GET.urlencode())
+
+
+def lesson_etag(request, enrollment_id, lesson_id):
+    if not request.user.is_authenticated:
+        return None
+    visitor = visitor_parts(request)
+    if visitor is None:
+        return None
+    enrollment = Enrollment.objects.filter(pk=enrollment_id, user=request.user).values_list(
+        'status', 'progress_version', 'course__updated_at', 'course__outline_version',
+    ).first()
+    if enrollment is None:
+        return None
+    return make_etag('lesson', enrollment_id, lesson_id, *enrollment, *visitor)
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Enrollment
+
+
+# Learner dashboard snapshots, enabled by settings.DASHBOARD_SNAPSHOT_TIMEOUT
+DASHBOARD_KEY = 'dashboard:{user_id}'
+
+
+def build_dashboard(user):
+    """Enrollment list and status counts for a learner's dashboard"""
+    enrollments = list(Enrollment.objects.filter(user=user).select_related('course').order_by('-enrollment_date'))
+    counts = Enrollment.objects.filter(user=user).aggregate(
+        enrollment_count=Count('id'),
+        completed_count=Count('id', filter=Q(status='completed')),
+        in_progress_count=Count('id', filter=Q(status='in_progress')),
+    )
+    # "Total" has always meant courses started: in progress plus completed
+    counts['total_count'] = counts['completed_count'] + counts['in_progress_count']
+    return {'enrollments': enrollments, **counts}
+
+
+def get_dashboard(user):
+    timeout = getattr(settings, 'DASHBOARD_SNAPSHOT_TIMEOUT', 0)
+    if not timeout:
+        return build_dashboard(user)
+    key = DASHBOARD_KEY.format(user_id=user.pk)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_dashboard(user)
+        cache.set(key, snapshot, timeout)
+    return snapshot
+
+
+def invalidate_dashboard(user_id):
+    cache.delete(DASHBOARD_KEY.format(user_id=user_id))
@@ -0,0 +1,193 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import require_safe
+
+from .certificates import stored_certificate
+from .models import Certificate, Enrollment, Lesson, Task
+
+
+# Protected content downloads
+# Lesson and task files are only handed to staff and enrolled learners (plus
+# anyone, for preview lessons), certificates to their holder and staff.
+# Django either streams the file itself, with Range and conditional request
+# support, or checks access and leaves the bytes to the front proxy via
+# X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd), depending on
+# settings.PROTECTED_MEDIA_SERVER.
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read-only view of ``length`` bytes of an open file, starting at ``start``"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets the WSGI server sendfile() from the current offset; the
+        # Content-Length header bounds how much it sends
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def can_access(user, course_id, preview=False):
+    if preview or user.is_staff:
+        return True
+    return user.is_authenticated and Enrollment.objects.filter(
+        user=user, course_id=course_id,
+    ).exclude(status='cancelled').exists()
+
+
+def parse_range(header, size):
+    """``(start, end)`` of a single byte range, None to send the whole file, or False if unsatisfiable.
+
+    Multi-range requests are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def proxy_response(name, path, content_type):
+    """Empty response telling the front proxy which file to send"""
+    response = HttpResponse(content_type=content_type)
+    if settings.PROTECTED_MEDIA_SERVER == 'nginx':
+        response['X-Accel-Redirect'] = quote(settings.PROTECTED_MEDIA_INTERNAL_URL + name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_file(request, storage, name):
+    filename = os.path.basename(name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storage: its URLs are expected to be signed and short-lived
+        return HttpResponseRedirect(storage.url(name))
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('File not found')
+
+    if settings.PROTECTED_MEDIA_SERVER:
+        response = proxy_response(name, path, content_type)
+    else:
+        response = stream_file(request, path, stat, content_type)
+    if response.status_code in (200, 206):
+        response['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(filename)}"
+    response['Cache-Control'] = 'private, no-cache'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def stream_file(request, path, stat, content_type):
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if 'Range' in request.headers:
+        if_range = request.headers.get('If-Range')
+        # A stale If-Range means the client's partial copy is outdated: send it all
+        if if_range is None or etag in parse_etags(if_range):
+            byte_range = parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(file, content_type=content_type)
+    response.block_size = settings.PROTECTED_MEDIA_CHUNK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def denied(request):
+    if request.user.is_authenticated:
+        raise Http404('File not found')
+    return redirect_to_login(request.get_full_path())
+
+
+@require_safe
+def lesson_file(request, lesson_id):
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('module').only('content_file', 'is_preview', 'module__course_id'),
+        pk=lesson_id, is_active=True,
+    )
+    if not lesson.content_file:
+        raise Http404('File not found')
+    if not can_access(request.user, lesson.module.course_id, preview=lesson.is_preview):
+        return denied(request)
+    return serve_file(request, lesson.content_file.storage, lesson.content_file.name)
+
+
+@require_safe
+def task_file(request, task_id):
+    task = get_object_or_404(
+        Task.objects.select_related('module').only('content_file', 'module__course_id'),
+        pk=task_id, is_active=True,
+    )
+    if not task.content_file:
+        raise Http404('File not found')
+    if not can_access(request.user, task.module.course_id):
+        return denied(request)
+    return serve_file(request, task.content_file.storage, task.content_file.name)
+
+
+@require_safe
+def certificate_file(request, certificate_id, extension):
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    certificate = get_object_or_404(
+        Certificate.objects.only('pk', 'certificate_id', 'enrollment__user_id').select_related('enrollment'),
+        certificate_id=certificate_id,
+    )
+    if certificate.enrollment.user_id != request.user.pk and not request.user.is_staff:
+        raise Http404('File not found')
+    return serve_file(request, default_storage, stored_certificate(certificate, extension))
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from .models import Course
+from .search import get_search_backend
+
+
+# Course catalog facets
+# One grouped query over (category, level, course_type, price band) for the
+# active, searched catalog; each facet's counts are then summed in Python over
+# the rows matching the *other* selected facets, so picking a category still
+# shows how many courses the other categories hold.
+PRICE_BANDS = [
+    ('free', 'Free'),
+    ('under_1000', 'Under ₹1,000'),
+    ('1000_5000', '₹1,000 – ₹5,000'),
+    ('over_5000', 'Over ₹5,000'),
+]
+
+LEVEL_CHOICES = Course._meta.get_field('level').choices
+
+# (facet name, GET parameter, label, choices)
+FACETS = [
+    ('category', 'category', 'Categories', Course.CATEGORY_TYPES),
+    ('level', 'level', 'Levels', LEVEL_CHOICES),
+    ('course_type', 'type', 'Types', Course.COURSE_TYPES),
+    ('price_band', 'price', 'Prices', PRICE_BANDS),
+]
+
+FACETS_KEY = 'catalog:facets:{version}:{digest}'
+FACETS_VERSION_KEY = 'catalog:facets:version'
+
+
+def price_band():
+    """Price band of a course; free courses count as free whatever their price"""
+    return Case(
+        When(Q(course_type='free') | Q(price__lte=0), then=Value('free')),
+        When(price__lt=1000, then=Value('under_1000')),
+        When(price__lt=5000, then=Value('1000_5000')),
+        default=Value('over_5000'),
+        output_field=CharField(),
+    )
+
+
+def catalog_filters(params):
+    """Selected facet values from request parameters; unknown price bands are dropped"""
+    filters = {}
+    for name, param, _, _ in FACETS:
+        value = params.get(param)
+        if value and (name != 'price_band' or value in dict(PRICE_BANDS)):
+            filters[name] = value
+    return filters
+
+
+def apply_catalog_filters(queryset, filters):
+    if 'price_band' in filters:
+        queryset = queryset.alias(price_band=price_band())
+    return queryset.filter(**filters)
+
+
+def build_facets(filters, search=''):
+    queryset = Course.objects.filter(is_active=True)
+    if search:
+        queryset = get_search_backend().search(queryset, search)
+    rows = queryset.order_by().values(
+        'category', 'level', 'course_type', price_band=price_band(),
+    ).annotate(count=Count('id'))
+
+    counts = {name: {} for name, _, _, _ in FACETS}
+    for row in rows:
+        for name in counts:
+            if all(row[other] == value for other, value in filters.items() if other != name):
+                counts[name][row[name]] = counts[name].get(row[name], 0) + row['count']
+
+    facets = []
+    for name, param, label, choices in FACETS:
+        # Values come from the data (categories are free text in practice), in
+        # choice order first; the selected value stays listed even at zero
+        values = set(counts[name])
+        if name in filters:
+            values.add(filters[name])
+        order = [value for value, _ in choices]
+        labels = dict(choices)
+        facets.append({
+            'name': name,
+            'param': param,
+            'label': label,
+            'selected': filters.get(name, ''),
+            'options': [
+                {'value': value, 'label': labels.get(value, value.title()), 'count': counts[name].get(value, 0)}
+                for value in sorted(values, key=lambda value: (
+                    order.index(value) if value in order else len(order), value,
+                ))
+            ],
+        })
+    return facets
+
+
+def get_facets(filters, search=''):
+    """Facet counts for a filter combination, cached until a course changes"""
+    timeout = getattr(settings, 'CATALOG_FACETS_TIMEOUT', 0)
+    if not timeout:
+        return build_facets(filters, search)
+    version = cache.get_or_set(FACETS_VERSION_KEY, time.time_ns, None)
+    digest = hashlib.md5(json.dumps([sorted(filters.items()), search.strip().lower()]).encode()).hexdigest()
+    key = FACETS_KEY.format(version=version, digest=digest)
+    facets = cache.get(key)
+    if facets is None:
+        facets = build_facets(filters, search)
+        cache.set(key, facets, timeout)
+    return facets
+
+
+def invalidate_facets():
+    try:
+        cache.incr(FACETS_VERSION_KEY)
+    except ValueError:
+        # Not set yet or evicted: a clock-based version can't reuse old entries
+        cache.set(FACETS_VERSION_KEY, time.time_ns(), None)
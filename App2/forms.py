@@ -1,7 +1,11 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm, AuthenticationForm, PasswordResetForm, SetPasswordForm
 from django.contrib.auth.models import User
+from django.template import loader
+from django.urls import reverse
 from .models import UserProfile, Course, Module, Task, Quiz, QuizQuestion, Discussion, DiscussionReply, Lesson, Enrollment, Review, ContactMessage
+from .jobs import enqueue
+from .uploads import claim_upload
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Fieldset, ButtonHolder, Submit, Field, Div, HTML
 from crispy_bootstrap5.bootstrap5 import BS5Accordion
@@ -248,7 +252,33 @@ class ModuleForm(forms.ModelForm):
         )
 
 
-class TaskForm(forms.ModelForm):
+class ChunkedUploadFormMixin:
+    """Lets content_file arrive through a resumable upload session (see App2/uploads.py)
+
+    The page's script uploads large files in chunks and puts the session id in
+    the hidden content_upload field instead of posting the file itself.
+    """
+    upload_target = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['content_file'].widget.attrs.update({
+            'data-chunked-upload': self.upload_target,
+            'data-upload-url': reverse('upload_start'),
+        })
+
+    def attach_upload(self, instance, user):
+        upload_id = self.cleaned_data.get('content_upload')
+        if upload_id:
+            stored_name = claim_upload(upload_id, user, self.upload_target)
+            if stored_name:
+                instance.content_file.name = stored_name
+
+
+class TaskForm(ChunkedUploadFormMixin, forms.ModelForm):
+    content_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    upload_target = 'task'
+
     class Meta:
         model = Task
         fields = ['title', 'description', 'task_type', 'content_file', 'video_url',
@@ -266,6 +296,7 @@ class TaskForm(forms.ModelForm):
                 'description',
                 'task_type',
                 'content_file',
+                'content_upload',
                 'video_url',
                 'text_content',
                 'coding_instructions',
@@ -283,7 +314,8 @@ class TaskForm(forms.ModelForm):
 class QuizForm(forms.ModelForm):
     class Meta:
         model = Quiz
-        fields = ['title', 'description', 'time_limit_minutes', 'passing_score', 'is_active']
+        fields = ['title', 'description', 'time_limit_minutes', 'passing_score', 'draw_count', 'shuffle_options',
+                  'is_active']
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -296,6 +328,8 @@ class QuizForm(forms.ModelForm):
                 'description',
                 'time_limit_minutes',
                 'passing_score',
+                'draw_count',
+                'shuffle_options',
                 'is_active',
             ),
             ButtonHolder(
@@ -368,7 +402,10 @@ class DiscussionReplyForm(forms.ModelForm):
         )
 
 
-class LessonForm(forms.ModelForm):
+class LessonForm(ChunkedUploadFormMixin, forms.ModelForm):
+    content_upload = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    upload_target = 'lesson'
+
     class Meta:
         model = Lesson
         fields = ['title', 'description', 'content_type', 'content_file', 'video_url',
@@ -385,6 +422,7 @@ class LessonForm(forms.ModelForm):
                 'description',
                 'content_type',
                 'content_file',
+                'content_upload',
                 'video_url',
                 'text_content',
                 'duration_minutes',
@@ -478,6 +516,18 @@ class CustomPasswordResetForm(PasswordResetForm):
             )
         )
 
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email,
+                  html_email_template_name=None):
+        """Render the reset mail now and hand delivery to the job queue"""
+        subject = ''.join(loader.render_to_string(subject_template_name, context).splitlines())
+        enqueue('send_email', {
+            'subject': subject,
+            'body': loader.render_to_string(email_template_name, context),
+            'to': [to_email],
+            'from_email': from_email,
+            'html_body': loader.render_to_string(html_email_template_name, context) if html_email_template_name else None,
+        }, priority=10)
+
 
 class CustomSetPasswordForm(SetPasswordForm):
     def __init__(self, *args, **kwargs):
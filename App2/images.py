@@ -0,0 +1,120 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+# Responsive image derivatives
+# Every upload gets downscaled WebP and JPEG copies at fixed widths, stored
+# next to the original as <name>.w<width>.<ext>. Which widths exist is
+# recorded in the owning row's image_variants ({field: {'source': name,
+# 'width': original width, 'widths': [...]}}), so templates can build srcset
+# without touching storage.
+DERIVATIVE_WIDTHS = {
+    'thumbnail': [320, 640, 960],
+    'cover_image': [640, 1280, 1920],
+    'profile_image': [64, 128, 256],
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def derivative_name(name, width, extension):
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}.{extension}'
+
+
+def is_current(variants, field_name, name):
+    entry = (variants or {}).get(field_name)
+    return bool(entry) and entry.get('source') == name
+
+
+def encode(image, extension):
+    if extension == 'jpg' and image.mode != 'RGB':
+        # JPEG has no alpha: flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    elif extension == 'webp' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, **FORMATS[extension])
+    return buffer.getvalue()
+
+
+def generate_derivatives(fieldfile, widths):
+    """Write the derivatives of one image.
+
+    Returns ``(widths produced, original width)``.
+
+    Only widths narrower than the original are produced, so small uploads
+    are never upscaled.
+    """
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    produced = []
+    for width in sorted(widths):
+        if width >= original.width:
+            break
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+        for extension in FORMATS:
+            name = derivative_name(fieldfile.name, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(encode(resized, extension)))
+        produced.append(width)
+    return produced, original.width
+
+
+def delete_derivatives(storage, name, widths):
+    for width in widths:
+        for extension in FORMATS:
+            derivative = derivative_name(name, width, extension)
+            if storage.exists(derivative):
+                storage.delete(derivative)
+
+
+def refresh_image_variants(instance, field_names, force=False):
+    """Generate missing or outdated derivatives for an instance's image fields.
+
+    Writes image_variants with a queryset update (and mirrors it on the
+    instance). Returns the names of the fields that were regenerated.
+    """
+    variants = dict(instance.image_variants or {})
+    regenerated = []
+    for field_name in field_names:
+        fieldfile = getattr(instance, field_name)
+        previous = variants.get(field_name)
+        if not fieldfile and not previous:
+            continue
+        if fieldfile and not force and is_current(variants, field_name, fieldfile.name):
+            continue
+        if previous:
+            delete_derivatives(fieldfile.storage, previous['source'], previous['widths'])
+            del variants[field_name]
+        if fieldfile:
+            try:
+                widths, width = generate_derivatives(fieldfile, DERIVATIVE_WIDTHS[field_name])
+            except (OSError, Image.DecompressionBombError):
+                # Missing or unreadable originals keep being served as they are
+                if previous:
+                    regenerated.append(field_name)
+                continue
+            variants[field_name] = {'source': fieldfile.name, 'width': width, 'widths': widths}
+        regenerated.append(field_name)
+
+    if regenerated:
+        type(instance).objects.filter(pk=instance.pk).update(image_variants=variants)
+        instance.image_variants = variants
+    return regenerated
@@ -0,0 +1,188 @@
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+import numpy
+
+from .models import QuizAnswer, QuizAttempt, QuizItemStats, QuizQuestion, QuizStats
+
+
+# Quiz item analysis
+# Per question: p-value (share of the attempts that drew it answering it
+# correctly), point-biserial correlation of correctness with the attempt
+# score, and how often each response was picked; per quiz: Cronbach's alpha.
+# All of them are functions of a few sums, so QuizStats/QuizItemStats keep
+# the sums and each refresh only adds the attempts submitted since the last
+# one. The new answers are loaded as (attempt, question, correct, points)
+# columns and summed with NumPy. A new quiz version (questions added, removed
+# or re-scored) starts the totals over.
+
+# Submissions newer than this may still be committing, so they wait for the next refresh
+SETTLE = timedelta(minutes=1)
+# Responses worth counting; short answers are free text
+COUNTED_TYPES = ('multiple_choice', 'true_false')
+
+
+def answer_sums(attempts, question_ids, rows):
+    """Sums over a batch of attempts for every question.
+
+    ``attempts`` are ``(attempt id, question ids drawn)``, an empty draw
+    meaning every question; ``rows`` are ``(attempt id, question id,
+    is_correct, points)``. Drawn questions left unanswered count as
+    incorrect. Returns ``(quiz sums, {question_id: sums})``.
+    """
+    attempts = sorted(attempts)
+    ids = numpy.array([attempt_id for attempt_id, _ in attempts], dtype=numpy.int64)
+    questions = numpy.sort(numpy.array(question_ids, dtype=numpy.int64))
+    answers = numpy.array(rows, dtype=numpy.int64).reshape(-1, 4)
+    row = numpy.searchsorted(ids, answers[:, 0])
+    column = numpy.searchsorted(questions, answers[:, 1])
+    correct, points = answers[:, 2], answers[:, 3]
+
+    def per_question(columns, weights=None):
+        return numpy.bincount(columns, weights=weights, minlength=len(questions)).astype(numpy.int64)
+
+    # Attempt scores, then every per-question sum as a weighted bincount
+    totals = numpy.bincount(row, weights=points, minlength=len(ids)).astype(numpy.int64)
+    # Attempts asked every question add to every question at once; drawn ones per (attempt, question)
+    full = totals[numpy.array([not drawn for _, drawn in attempts], dtype=bool)]
+    known = set(question_ids)
+    drawn = numpy.array([
+        (index, question_id) for index, (_, drawn) in enumerate(attempts)
+        for question_id in drawn if question_id in known
+    ], dtype=numpy.int64).reshape(-1, 2)
+    drawn_column, drawn_totals = numpy.searchsorted(questions, drawn[:, 1]), totals[drawn[:, 0]]
+
+    columns = zip(
+        (per_question(drawn_column) + len(full)).tolist(),
+        (per_question(drawn_column, drawn_totals) + full.sum()).tolist(),
+        (per_question(drawn_column, drawn_totals * drawn_totals) + (full * full).sum()).tolist(),
+        per_question(column, correct).tolist(), per_question(column, points).tolist(),
+        per_question(column, points * points).tolist(), per_question(column, correct * totals[row]).tolist(),
+    )
+    fields = (
+        'attempt_count', 'total_sum', 'total_sq_sum', 'correct_count', 'score_sum', 'score_sq_sum',
+        'correct_total_sum',
+    )
+    sums = {question_id: dict(zip(fields, values)) for question_id, values in zip(questions.tolist(), columns)}
+    quiz_sums = {
+        'attempt_count': len(ids), 'total_sum': int(totals.sum()), 'total_sq_sum': int((totals * totals).sum()),
+    }
+    return quiz_sums, sums
+
+
+def p_value(item):
+    return item.correct_count / item.attempt_count if item.attempt_count else None
+
+
+def point_biserial(item):
+    """Pearson correlation of 0/1 correctness with the attempt score"""
+    n, correct = item.attempt_count, item.correct_count
+    spread = (n * correct - correct * correct) * (n * item.total_sq_sum - item.total_sum * item.total_sum)
+    if spread <= 0:
+        return None
+    return (n * item.correct_total_sum - correct * item.total_sum) / math.sqrt(spread)
+
+
+def cronbach_alpha(stats, items):
+    """k/(k-1) * (1 - sum of item score variances / variance of the attempt scores).
+
+    Only defined when every attempt was asked every question.
+    """
+    n, k = stats.attempt_count, len(items)
+    total_spread = n * stats.total_sq_sum - stats.total_sum * stats.total_sum
+    if k < 2 or total_spread <= 0 or any(item.attempt_count != n for item in items):
+        return None
+    item_spread = sum(n * item.score_sq_sum - item.score_sum * item.score_sum for item in items)
+    return k / (k - 1) * (1 - item_spread / total_spread)
+
+
+def new_attempts(quiz, since, until):
+    attempts = QuizAttempt.objects.filter(quiz=quiz, status='submitted', submitted_at__lte=until)
+    if since is not None:
+        attempts = attempts.filter(submitted_at__gt=since)
+    return attempts
+
+
+def refresh_quiz_stats(quiz, rebuild=False):
+    """Fold the attempts submitted since the last refresh into a quiz's stats.
+
+    Starts over when asked to or when the questions changed. Returns the
+    number of attempts added.
+    """
+    until = timezone.now() - SETTLE
+    with transaction.atomic():
+        stats, _ = QuizStats.objects.get_or_create(quiz=quiz)
+        # Concurrent refreshes would count the same attempts twice
+        stats = QuizStats.objects.select_for_update().get(pk=stats.pk)
+        if rebuild or stats.quiz_version != quiz.version:
+            stats.items.all().delete()
+            stats.quiz_version, stats.analyzed_through = quiz.version, None
+            stats.attempt_count = stats.total_sum = stats.total_sq_sum = 0
+
+        question_ids = list(QuizQuestion.objects.filter(quiz=quiz).values_list('id', flat=True))
+        items = {item.question_id: item for item in stats.items.all()}
+        for question_id in question_ids:
+            items.setdefault(question_id, QuizItemStats(quiz_stats=stats, question_id=question_id))
+
+        attempts = new_attempts(quiz, stats.analyzed_through, until)
+        drawn = list(attempts.values_list('id', 'question_ids'))
+        if drawn:
+            answers = QuizAnswer.objects.filter(
+                attempt__in=attempts, question__quiz=quiz,
+            ).values_list('attempt_id', 'question_id', 'is_correct', 'points_awarded')
+            quiz_sums, item_sums = answer_sums(drawn, question_ids, list(answers))
+            for field, value in quiz_sums.items():
+                setattr(stats, field, getattr(stats, field) + value)
+            for question_id, sums in item_sums.items():
+                for field, value in sums.items():
+                    setattr(items[question_id], field, getattr(items[question_id], field) + value)
+
+            # Response frequencies are grouped by the database
+            for question_id, response, count in QuizAnswer.objects.filter(
+                attempt__in=attempts, question__quiz=quiz, question__question_type__in=COUNTED_TYPES,
+            ).values_list('question_id', 'response').annotate(count=Count('id')).order_by():
+                counts = items[question_id].response_counts
+                counts[response] = counts.get(response, 0) + count
+            stats.analyzed_through = attempts.aggregate(latest=Max('submitted_at'))['latest']
+
+        for item in items.values():
+            item.p_value = p_value(item)
+            item.point_biserial = point_biserial(item)
+        stats.cronbach_alpha = cronbach_alpha(stats, list(items.values()))
+        stats.updated_at = timezone.now()
+        stats.save()
+
+        fields = [
+            'attempt_count', 'correct_count', 'score_sum', 'score_sq_sum', 'total_sum', 'total_sq_sum',
+            'correct_total_sum', 'response_counts', 'p_value', 'point_biserial',
+        ]
+        QuizItemStats.objects.bulk_update([item for item in items.values() if item.pk], fields, batch_size=500)
+        QuizItemStats.objects.bulk_create([item for item in items.values() if not item.pk])
+    return len(drawn)
+
+
+def item_report(quiz):
+    """Stored stats for a quiz's questions, in question order, with option labels resolved"""
+    rows = []
+    for question in quiz.questions.select_related('stats').order_by('order'):
+        item = getattr(question, 'stats', None)
+        counts = item.response_counts if item else {}
+        if question.question_type == 'multiple_choice' and question.options:
+            responses = [(option, counts.get(str(index), 0)) for index, option in enumerate(question.options)]
+        elif question.question_type == 'true_false':
+            responses = [(value.title(), counts.get(value, 0)) for value in ('true', 'false')]
+        else:
+            responses = []
+        answered = sum(count for _, count in responses)
+        rows.append({
+            'question': question,
+            'stats': item,
+            'responses': [
+                {'label': label, 'count': count, 'share': count * 100 / answered if answered else 0}
+                for label, count in responses
+            ],
+        })
+    return rows
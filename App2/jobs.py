@@ -0,0 +1,141 @@
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+# Database-backed job queue
+# Views enqueue a row and return; `manage.py run_workers` claims ready rows with
+# a conditional UPDATE (so several workers never run the same job), runs them
+# on a thread pool and retries failures with exponential backoff. A claimed job
+# whose visibility timeout expires (its worker died) becomes claimable again.
+# With settings.JOBS_EAGER, jobs run in-process after the transaction commits
+# instead, for deployments that can't keep a worker running. Payloads can hold
+# verification codes and reset links, so they are cleared once a job finishes,
+# and finished rows are purged after settings.JOBS_RETENTION_DAYS.
+TASKS = {}
+
+BACKOFF_MAX_SECONDS = 60 * 60
+# Ready jobs this old mean no worker is claiming them
+STALE_AFTER = timedelta(minutes=10)
+
+
+def task(name):
+    """Register a function as a job handler; it receives the payload as keyword arguments"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, priority=0, delay=0, max_attempts=5):
+    """Queue a job; it becomes visible to workers when the current transaction commits"""
+    if name not in TASKS:
+        raise KeyError(f'Unknown job task: {name}')
+    payload = payload or {}
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: run_eagerly(name, payload))
+        return None
+    warn_if_unclaimed()
+    return Job.objects.create(
+        task=name, payload=payload, priority=priority, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def warn_if_unclaimed():
+    if Job.objects.filter(status='queued', run_at__lt=timezone.now() - STALE_AFTER).exists():
+        logger.error(
+            'Queued jobs have waited over %s minutes; start `manage.py run_workers` or set JOBS_EAGER',
+            int(STALE_AFTER.total_seconds() // 60),
+        )
+
+
+def run_eagerly(name, payload):
+    try:
+        TASKS[name](**payload)
+    except Exception:
+        logger.exception('Job %s failed', name)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def backoff_seconds(attempts):
+    base = getattr(settings, 'JOBS_BACKOFF_SECONDS', 10)
+    delay = min(base * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    # Jitter so jobs that failed together don't retry together
+    return delay + random.uniform(0, delay / 2)
+
+
+def ready_jobs(now):
+    return Job.objects.filter(
+        Q(status='queued', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+    )
+
+
+def claim_jobs(worker, limit, visibility_timeout):
+    """Lock up to ``limit`` ready jobs for ``worker``, highest priority first"""
+    now = timezone.now()
+    candidates = list(ready_jobs(now).order_by('-priority', 'run_at', 'id').values_list('id', flat=True)[:limit])
+    claimed = []
+    for job_id in candidates:
+        # Only one worker's UPDATE can still match a ready row
+        if ready_jobs(now).filter(pk=job_id).update(
+            status='running', locked_by=worker, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+        ):
+            claimed.append(job_id)
+    return list(Job.objects.filter(pk__in=claimed).order_by('-priority', 'run_at', 'id'))
+
+
+def run_job(job, worker):
+    """Run a claimed job and record the outcome; returns the new status"""
+    mine = Job.objects.filter(pk=job.pk, locked_by=worker, status='running')
+    handler = TASKS.get(job.task)
+    try:
+        if handler is None:
+            raise LookupError(f'Unknown job task: {job.task}')
+        if job.attempts > job.max_attempts:
+            # Its worker kept dying while running it
+            raise RuntimeError('Visibility timeout expired on the final attempt')
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if handler is None or job.attempts >= job.max_attempts:
+            mine.update(status='failed', payload={}, last_error=error, locked_until=None, finished_at=now)
+            logger.error('Job %s #%s failed permanently:\n%s', job.task, job.pk, error)
+            return 'failed'
+        mine.update(
+            status='queued', last_error=error, locked_until=None,
+            run_at=now + timedelta(seconds=backoff_seconds(job.attempts)),
+        )
+        logger.warning('Job %s #%s failed (attempt %s of %s)', job.task, job.pk, job.attempts, job.max_attempts)
+        return 'queued'
+    else:
+        mine.update(status='succeeded', payload={}, last_error='', locked_until=None, finished_at=timezone.now())
+        return 'succeeded'
+    finally:
+        # Worker threads each hold their own connection
+        close_old_connections()
+
+
+def purge_finished_jobs(older_than):
+    """Delete succeeded and failed jobs that finished more than ``older_than`` ago; returns how many"""
+    deleted, _ = Job.objects.filter(
+        status__in=['succeeded', 'failed'], finished_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from App2.models import Course
+from App2.search import IContainsSearchBackend, get_search_backend
+
+
+WORDS = [
+    'python', 'django', 'data', 'science', 'machine', 'learning', 'web', 'design', 'cloud', 'security',
+    'network', 'database', 'algorithms', 'statistics', 'marketing', 'finance', 'leadership', 'writing',
+    'testing', 'devops', 'mobile', 'android', 'kubernetes', 'analytics', 'excel', 'communication',
+]
+QUERIES = ['python', 'machine learning', 'data scien', 'kubernetes security', 'leadership writing']
+# Filler vocabulary so the topic words above are as selective as in a real catalog
+FILLER_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Time catalog search against the icontains filter on a synthetic catalog (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, action='append', dest='sizes',
+                            help='Catalog size to generate (repeatable, default 10000 and 100000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (default 5)')
+
+    def handle(self, *args, **options):
+        for size in options['sizes'] or [10000, 100000]:
+            with transaction.atomic():
+                self.populate(size)
+                backend = get_search_backend()
+                backend.rebuild()
+                for query in QUERIES:
+                    indexed = self.time_search(backend, query, options['repeat'])
+                    scanned = self.time_search(IContainsSearchBackend(), query, options['repeat'])
+                    self.stdout.write(
+                        f'{size:>7} courses  {query!r:<24} {type(backend).__name__}: {indexed:8.1f} ms   '
+                        f'icontains: {scanned:8.1f} ms'
+                    )
+                transaction.set_rollback(True)
+
+    def populate(self, size):
+        rng = random.Random(size)
+        vocabulary = WORDS + [
+            ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 10))) for _ in range(FILLER_SIZE)
+        ]
+        start = Course.objects.count()
+        Course.objects.bulk_create([
+            Course(
+                title=' '.join(rng.sample(vocabulary, 3)).title(),
+                slug=f'benchmark-{start + number}',
+                short_description=' '.join(rng.choices(vocabulary, k=12)),
+                description=' '.join(rng.choices(vocabulary, k=120)),
+                thumbnail='courses/thumbnails/benchmark.jpg',
+                instructor=f'Instructor {rng.choice(WORDS).title()}',
+            )
+            for number in range(size)
+        ], batch_size=1000)
+
+    def time_search(self, backend, query, repeat):
+        """Median milliseconds to fetch the first catalog page of results"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(backend.search(Course.objects.filter(is_active=True), query)[:12])
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[len(timings) // 2]
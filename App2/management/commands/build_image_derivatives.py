@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from App2.images import refresh_image_variants
+from App2.models import Course, UserProfile
+from App2.pagecache import bump_generation
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or outdated responsive image derivatives for existing uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate every derivative, even ones that are up to date')
+
+    def handle(self, *args, **options):
+        for model in (Course, UserProfile):
+            fields = model.IMAGE_FIELDS
+            regenerated = 0
+            for instance in model.objects.only('id', 'image_variants', *fields).iterator(chunk_size=200):
+                if refresh_image_variants(instance, fields, force=options['force']):
+                    regenerated += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural.capitalize()}: {regenerated} updated.'
+            ))
+            if model is Course and regenerated:
+                # Cached pages were rendered without the new srcsets
+                bump_generation('course')
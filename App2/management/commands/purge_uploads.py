@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from App2.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions (and their files) that have not been touched for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Age in hours after which an untouched session is discarded')
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'{purged} upload sessions purged.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from App2.models import Course, Enrollment
+from App2.outline import build_course_bitmaps
+
+
+class Command(BaseCommand):
+    help = 'Backfill enrollment completion bitmaps from Progress rows, or check them with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help='Only process this course id (repeatable)')
+        parser.add_argument('--check', action='store_true',
+                            help='Report enrollments whose bitmap disagrees with Progress rows without writing')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.order_by('id')
+        if options['courses']:
+            courses = courses.filter(id__in=options['courses'])
+
+        checked = mismatched = 0
+        for course_id in courses.values_list('id', flat=True):
+            index, expected = build_course_bitmaps(course_id)
+            stale = []
+            for enrollment in Enrollment.objects.filter(course_id=course_id).only(
+                'id', 'completion_bitmap', 'completion_bitmap_signature',
+            ):
+                checked += 1
+                bitmap = expected[enrollment.id]
+                if (bytes(enrollment.completion_bitmap), enrollment.completion_bitmap_signature) != (bitmap, index.signature):
+                    enrollment.completion_bitmap = bitmap
+                    enrollment.completion_bitmap_signature = index.signature
+                    stale.append(enrollment)
+
+            mismatched += len(stale)
+            if options['check']:
+                for enrollment in stale:
+                    self.stdout.write(f'Enrollment {enrollment.id} (course {course_id}): bitmap out of date')
+            else:
+                Enrollment.objects.bulk_update(
+                    stale, ['completion_bitmap', 'completion_bitmap_signature'], batch_size=500
+                )
+
+        if options['check']:
+            if mismatched:
+                raise CommandError(f'{mismatched} of {checked} enrollment bitmap(s) are inconsistent.')
+            self.stdout.write(self.style.SUCCESS(f'All {checked} enrollment bitmap(s) are consistent.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {mismatched} of {checked} enrollment bitmap(s).'))
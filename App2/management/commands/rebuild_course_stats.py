@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from App2.outline import rebuild_all_stats
+from App2.ratings import rebuild_rating_summaries
+from App2.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized outline counters, rating summaries and search index of every course'
+
+    def handle(self, *args, **options):
+        modules_changed, courses_changed = rebuild_all_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt outline counters: {modules_changed} module(s) and {courses_changed} course(s) corrected.'
+        ))
+        ratings_changed = rebuild_rating_summaries()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rating summaries: {ratings_changed} course(s) corrected.'
+        ))
+        get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the course search index.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from App2.item_analysis import refresh_quiz_stats
+from App2.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Fold newly submitted quiz attempts into the per-question item analysis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help='Quizzes to refresh (default: all)')
+        parser.add_argument('--rebuild', action='store_true', help='Start the totals over from every attempt')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('pk')
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(pk__in=options['quiz_ids'])
+        for quiz in quizzes:
+            added = refresh_quiz_stats(quiz, rebuild=options['rebuild'])
+            self.stdout.write(f'{quiz.title}: {added} attempt(s) added.')
+        self.stdout.write(self.style.SUCCESS('Quiz stats refreshed.'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from App2.certificates import certificate_rows, render_in_pool, template_version
+from App2.models import Certificate, Enrollment
+from App2.pagecache import bump_generation
+
+
+class Command(BaseCommand):
+    help = 'Render and store certificate files for the current template version on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issue-missing', action='store_true',
+                            help='First create certificates for completed enrollments that have none')
+        parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render files that already exist for this template version')
+
+    def handle(self, *args, **options):
+        if options['issue_missing']:
+            missing = list(Enrollment.objects.filter(status='completed').exclude(
+                Exists(Certificate.objects.filter(enrollment=OuterRef('pk'))),
+            ).values_list('pk', flat=True))
+            Certificate.objects.bulk_create([Certificate(enrollment_id=pk) for pk in missing], batch_size=1000)
+            Enrollment.objects.filter(pk__in=missing).update(certificate_issued=True)
+            # bulk_create skips the signal that expires cached "not found" verifications
+            bump_generation('certificate')
+            self.stdout.write(f'{len(missing)} certificates issued.')
+
+        rows = list(certificate_rows(Certificate.objects.order_by('pk')))
+        current = {row['certificate_id']: (row['id'], row['certificate_file']) for row in rows}
+        self.stdout.write(f'Rendering {len(rows)} certificates (template v{template_version()})...')
+
+        changed = []
+        for done, (certificate_id, name) in enumerate(
+            render_in_pool(rows, processes=options['processes'], force=options['force']), 1,
+        ):
+            pk, stored = current[certificate_id]
+            if stored != name:
+                changed.append(Certificate(pk=pk, certificate_file=name))
+            if done % 1000 == 0:
+                self.stdout.write(f'  {done}/{len(rows)}')
+        Certificate.objects.bulk_update(changed, ['certificate_file'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f'{len(rows)} certificates stored, {len(changed)} updated.'))
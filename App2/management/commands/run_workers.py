@@ -0,0 +1,69 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from App2.jobs import claim_jobs, purge_finished_jobs, run_job, worker_name
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails, image derivatives) on a pool of worker threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Jobs to run at once')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait before polling again when the queue is empty')
+        parser.add_argument('--visibility-timeout', type=int, default=300,
+                            help='Seconds before a claimed job whose worker vanished is run again')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+        parser.add_argument('--retention-days', type=int, default=settings.JOBS_RETENTION_DAYS,
+                            help='Days to keep finished jobs before purging them (checked hourly)')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            # Finish the jobs in hand, claim nothing new
+            stopping.set()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker} running {options["threads"]} threads.')
+        counts = {'succeeded': 0, 'queued': 0, 'failed': 0}
+        running = set()
+        retention = timedelta(days=options['retention_days'])
+        next_purge = 0
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            while not stopping.is_set():
+                if time.monotonic() >= next_purge:
+                    purged = purge_finished_jobs(retention)
+                    if purged:
+                        self.stdout.write(f'Purged {purged} finished jobs.')
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+                free = options['threads'] - len(running)
+                jobs = claim_jobs(worker, free, options['visibility_timeout']) if free else []
+                close_old_connections()
+                running.update(pool.submit(run_job, job, worker) for job in jobs)
+                if not running:
+                    if options['once']:
+                        break
+                    stopping.wait(options['poll_interval'])
+                    continue
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    counts[future.result()] += 1
+                running -= done
+            for future in wait(running).done:
+                counts[future.result()] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{counts["succeeded"]} succeeded, {counts["queued"]} retrying, {counts["failed"]} failed.'
+        ))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:19
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_outline_counters(apps, schema_editor):
+    Course = apps.get_model('App2', 'Course')
+    Module = apps.get_model('App2', 'Module')
+    Lesson = apps.get_model('App2', 'Lesson')
+
+    lesson_totals = {
+        row['module_id']: row
+        for row in Lesson.objects.filter(is_active=True).values('module_id').annotate(
+            lesson_count=Count('id'), duration=Sum('duration_minutes'),
+        )
+    }
+    course_totals = {}
+    for module in Module.objects.all():
+        row = lesson_totals.get(module.id, {})
+        module.lesson_count = row.get('lesson_count') or 0
+        module.duration_minutes = row.get('duration') or 0
+        module.save(update_fields=['lesson_count', 'duration_minutes'])
+        if module.is_active:
+            totals = course_totals.setdefault(module.course_id, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += module.lesson_count
+            totals[2] += module.duration_minutes
+
+    for course_id, (modules, lessons, duration) in course_totals.items():
+        Course.objects.filter(pk=course_id).update(
+            total_modules=modules, total_lessons=lessons, total_duration_minutes=duration,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0003_remove_userprofile_address_userprofile_college_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='total_duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='total_modules',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_outline_counters, migrations.RunPython.noop),
+    ]
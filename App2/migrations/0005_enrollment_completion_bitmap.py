@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0004_course_outline_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completion_bitmap',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completion_bitmap_signature',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
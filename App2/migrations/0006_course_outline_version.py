@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0005_enrollment_completion_bitmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='outline_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:27
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    Course = apps.get_model('App2', 'Course')
+    Review = apps.get_model('App2', 'Review')
+
+    summaries = {}
+    for row in Review.objects.values('course_id', 'rating').annotate(count=Count('id')).order_by():
+        summary = summaries.setdefault(row['course_id'], {'rating_count': 0, 'rating_sum': 0})
+        summary['rating_count'] += row['count']
+        summary['rating_sum'] += row['rating'] * row['count']
+        summary[f"ratings_{row['rating']}"] = row['count']
+    for course_id, summary in summaries.items():
+        Course.objects.filter(pk=course_id).update(**summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0006_course_outline_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='ratings_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='ratings_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='ratings_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='ratings_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='ratings_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:29
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS App2_course_fts '
+            'USING fts5(title, short_description, description, instructor)'
+        )
+        schema_editor.execute(
+            'INSERT INTO App2_course_fts (rowid, title, short_description, description, instructor) '
+            'SELECT id, title, short_description, description, instructor FROM "App2_course"'
+        )
+    elif vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+
+        Course = apps.get_model('App2', 'Course')
+        Course.objects.update(search_vector=(
+            SearchVector('title', weight='A', config='english') +
+            SearchVector('short_description', weight='B', config='english') +
+            SearchVector('instructor', weight='B', config='english') +
+            SearchVector('description', weight='C', config='english')
+        ))
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "App2_course_search_vector_gin" '
+            'ON "App2_course" USING gin ("search_vector")'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS App2_course_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "App2_course_search_vector_gin"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0007_course_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:50
+
+from django.db import migrations, models
+
+
+def create_generations(apps, schema_editor):
+    CacheGeneration = apps.get_model('App2', 'CacheGeneration')
+    for name in ['course', 'outline', 'review']:
+        CacheGeneration.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0008_course_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_generations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0009_cache_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='progress_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0014_quiz_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quiz_version', models.PositiveIntegerField(default=0)),
+                ('analyzed_through', models.DateTimeField(blank=True, null=True)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('total_sum', models.PositiveBigIntegerField(default=0)),
+                ('total_sq_sum', models.PositiveBigIntegerField(default=0)),
+                ('cronbach_alpha', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='App2.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizItemStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.PositiveBigIntegerField(default=0)),
+                ('score_sq_sum', models.PositiveBigIntegerField(default=0)),
+                ('total_sum', models.PositiveBigIntegerField(default=0)),
+                ('total_sq_sum', models.PositiveBigIntegerField(default=0)),
+                ('correct_total_sum', models.PositiveBigIntegerField(default=0)),
+                ('response_counts', models.JSONField(blank=True, default=dict)),
+                ('p_value', models.FloatField(blank=True, null=True)),
+                ('point_biserial', models.FloatField(blank=True, null=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='App2.quizquestion')),
+                ('quiz_stats', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='App2.quizstats')),
+            ],
+        ),
+    ]
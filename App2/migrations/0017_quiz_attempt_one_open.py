@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:24
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def expire_duplicate_open_attempts(apps, schema_editor):
+    QuizAttempt = apps.get_model('App2', 'QuizAttempt')
+    # Keep the newest open attempt per learner and quiz
+    newest = QuizAttempt.objects.filter(status='in_progress').values('quiz_id', 'enrollment_id').annotate(
+        newest=Max('id'),
+    ).values_list('newest', flat=True)
+    QuizAttempt.objects.filter(status='in_progress').exclude(pk__in=list(newest)).update(
+        status='expired', submitted_at=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App2', '0016_quiz_question_pools'),
+    ]
+
+    operations = [
+        migrations.RunPython(expire_duplicate_open_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'in_progress')), fields=('quiz', 'enrollment'), name='quizattempt_one_open'),
+        ),
+    ]
@@ -1,9 +1,33 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Count, Q, F, Case, When, Value
 from django.contrib.auth.models import User
 from django.utils import timezone
+from decimal import Decimal, ROUND_HALF_EVEN
 import uuid
 
 
+class DenormalizedFieldsModel(models.Model):
+    """A model with counters and caches that only queryset updates write.
+
+    ``save()`` on an existing row leaves the fields named in
+    ``DENORMALIZED_FIELDS`` out of the UPDATE, so a stale instance never
+    writes old values back.
+    """
+    DENORMALIZED_FIELDS = []
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
 class UserProfile(models.Model):
     EDUCATION_CHOICES = [
         ('undergraduate', 'Undergraduate'),
@@ -30,11 +54,15 @@ class UserProfile(models.Model):
     date_of_birth = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Resized copies of profile_image (see App2/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    IMAGE_FIELDS = ['profile_image']
+
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username}'s profile"
 
 
-class Course(models.Model):
+class Course(DenormalizedFieldsModel):
     COURSE_TYPES = [
         ('free', 'Free'),
         ('premium', 'Premium'),
@@ -69,17 +97,59 @@ class Course(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Outline counters, maintained by App2.signals (see App2/outline.py)
+    total_modules = models.PositiveIntegerField(default=0, editable=False)
+    total_lessons = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_minutes = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped on every outline change; keys the cached outline and lesson index
+    outline_version = models.PositiveIntegerField(default=1, editable=False)
+
+    # Rating summary, maintained incrementally by App2.signals (see App2/ratings.py)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    ratings_1 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_2 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_3 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_4 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    # PostgreSQL full-text document (GIN indexed); SQLite uses an FTS5 table instead
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Resized copies of thumbnail and cover_image (see App2/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    IMAGE_FIELDS = ['thumbnail', 'cover_image']
+
+    # Written by queryset updates only, so a stale instance never saves them back
+    DENORMALIZED_FIELDS = [
+        'total_modules', 'total_lessons', 'total_duration_minutes', 'outline_version',
+        'rating_count', 'rating_sum', 'ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5',
+        'search_vector', 'image_variants',
+    ]
+
     def __str__(self):
         return self.title
 
     def get_total_modules(self):
-        return self.modules.count()
+        return self.total_modules
 
     def get_total_lessons(self):
-        return sum(module.get_lesson_count() for module in self.modules.all())
+        return self.total_lessons
 
     def get_total_duration(self):
-        return sum(module.get_duration() for module in self.modules.all())
+        return self.total_duration_minutes
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
+    @property
+    def rating_histogram(self):
+        """(stars, count, percentage) for 5 down to 1 stars"""
+        return [
+            (stars, count, round(count * 100 / self.rating_count) if self.rating_count else 0)
+            for stars, count in [(stars, getattr(self, f'ratings_{stars}')) for stars in range(5, 0, -1)]
+        ]
 
 
 class Module(models.Model):
@@ -90,6 +160,10 @@ class Module(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Active lesson counters, maintained by App2.signals
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    duration_minutes = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ['order']
         unique_together = ['course', 'order']
@@ -98,10 +172,10 @@ class Module(models.Model):
         return f"{self.course.title} - {self.title}"
 
     def get_lesson_count(self):
-        return self.lessons.count()
+        return self.lesson_count
 
     def get_duration(self):
-        return sum(lesson.duration_minutes for lesson in self.lessons.all())
+        return self.duration_minutes
 
 
 class Task(models.Model):
@@ -135,14 +209,23 @@ class Task(models.Model):
         return f"{self.module.title} - {self.title}"
 
 
-class Quiz(models.Model):
+class Quiz(DenormalizedFieldsModel):
     module = models.OneToOneField('Module', related_name='quiz', on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     time_limit_minutes = models.PositiveIntegerField(default=30)
     passing_score = models.PositiveIntegerField(default=70, help_text="Percentage required to pass")
     is_active = models.BooleanField(default=True)
+    draw_count = models.PositiveIntegerField(
+        default=0, help_text="Questions drawn at random for each attempt; 0 asks every question in order",
+    )
+    shuffle_options = models.BooleanField(default=False, help_text="Show multiple choice options in a random order")
     created_at = models.DateTimeField(default=timezone.now)
+    # Bumped whenever a question changes; keys the cached answer key (see App2/quizzes.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    # Written by queryset updates only, so a stale instance never saves them back
+    DENORMALIZED_FIELDS = ['version']
 
     def __str__(self):
         return f"Quiz for {self.module.title}"
@@ -230,7 +313,7 @@ class Lesson(models.Model):
         return f"{self.module.title} - {self.title}"
 
 
-class Enrollment(models.Model):
+class Enrollment(DenormalizedFieldsModel):
     STATUS_CHOICES = [
         ('enrolled', 'Enrolled'),
         ('in_progress', 'In Progress'),
@@ -247,35 +330,136 @@ class Enrollment(models.Model):
     certificate_issued = models.BooleanField(default=False)
     payment_status = models.BooleanField(default=True)  # True for free courses, False until paid for premium
 
+    # One bit per lesson, by position in the course's lesson index (see App2/outline.py).
+    # The signature identifies the outline the bits were written against.
+    completion_bitmap = models.BinaryField(default=b'', blank=True)
+    completion_bitmap_signature = models.PositiveBigIntegerField(default=0)
+    # Bumped whenever the learner's progress changes; part of the lesson page ETag
+    progress_version = models.PositiveIntegerField(default=1, editable=False)
+
+    # Written by queryset updates only, so a stale instance never saves them back
+    DENORMALIZED_FIELDS = ['completion_bitmap', 'completion_bitmap_signature', 'progress_version']
+
     class Meta:
         unique_together = ['user', 'course']
 
     def __str__(self):
         return f"{self.user.username} - {self.course.title}"
 
-    def update_progress(self):
-        """Update enrollment progress with precise calculation to prevent bulk completion"""
-        total_lessons = self.course.get_total_lessons()
+    def update_progress(self, completed_lessons=None, total_lessons=None, **extra_changes):
+        """Recompute progress with one aggregate query and persist it with one UPDATE.
+
+        Callers that already know the counts (e.g. from the completion bitmap) can
+        pass them in; ``extra_changes`` are written in the same UPDATE.
+
+        The status only moves forward: enrolled -> in_progress -> completed, and
+        a course is completed only when every active lesson is completed.
+        Cancelled enrollments keep their status and get no certificate.
+        """
+        from .certificates import issue_certificate
+        from .dashboard import invalidate_dashboard
+
+        if completed_lessons is None or total_lessons is None:
+            completed_lessons, total_lessons = Enrollment.objects.filter(pk=self.pk).annotate(
+                completed_lessons=Count('progress', filter=Q(
+                    progress__is_completed=True,
+                    progress__lesson__is_active=True,
+                    progress__lesson__module__is_active=True,
+                )),
+            ).values_list('completed_lessons', 'course__total_lessons').get()
+
+        is_complete = completed_lessons >= total_lessons
         if total_lessons == 0:
-            self.progress_percentage = 100.00
+            percentage = Decimal('100.00')
         else:
-            completed_lessons = Progress.objects.filter(
-                enrollment=self,
-                is_completed=True
-            ).count()
-            # Use higher precision to prevent rounding errors that could cause bulk completion
-            progress = (completed_lessons / total_lessons) * 100
-            self.progress_percentage = round(progress, 6)  # Use 6 decimal places for precision
-        self.save()
-
-        # Update status based on progress - only mark as completed when truly 100%
-        if self.progress_percentage >= 100.00 and self.status != 'completed':
+            # Rounded to the nearest hundredth as before (2/3 shows 66.67), but
+            # never up to 100 before the last lesson is done
+            percentage = min(
+                Decimal(completed_lessons * 100) / Decimal(total_lessons), Decimal('100')
+            ).quantize(Decimal('0.01'), rounding=ROUND_HALF_EVEN)
+            if not is_complete:
+                percentage = min(percentage, Decimal('99.99'))
+
+        changes = {
+            'progress_percentage': percentage,
+            'progress_version': F('progress_version') + 1,
+            **extra_changes,
+        }
+        if is_complete:
+            now = timezone.now()
+            # Keep the original completion date when the row is already completed
+            changes['status'] = Case(
+                When(status='cancelled', then=F('status')),
+                default=Value('completed'),
+            )
+            changes['completion_date'] = Case(
+                When(status='cancelled', then=F('completion_date')),
+                When(status='completed', completion_date__isnull=False, then=F('completion_date')),
+                default=Value(now),
+            )
+        elif completed_lessons > 0:
+            changes['status'] = Case(
+                When(status='enrolled', then=Value('in_progress')),
+                default=F('status'),
+            )
+        Enrollment.objects.filter(pk=self.pk).update(**changes)
+        invalidate_dashboard(self.user_id)
+        if is_complete and self.status != 'cancelled' and not self.certificate_issued:
+            issue_certificate(self)
+
+        # Mirror the conditional UPDATE on this instance
+        for field, value in extra_changes.items():
+            setattr(self, field, value)
+        self.progress_percentage = percentage
+        self.progress_version += 1
+        if is_complete and self.status != 'cancelled':
+            if self.status != 'completed' or self.completion_date is None:
+                self.completion_date = now
             self.status = 'completed'
-            self.completion_date = timezone.now()
-            self.save()
-        elif self.progress_percentage > 0 and self.status == 'enrolled':
+        elif completed_lessons > 0 and self.status == 'enrolled':
             self.status = 'in_progress'
-            self.save()
+
+    def complete_lesson(self, progress):
+        """Mark a lesson's progress record as completed and refresh course progress.
+
+        Returns False when the lesson was already completed.
+        """
+        from .outline import record_completion
+
+        if progress.is_completed:
+            return False
+        with transaction.atomic():
+            progress.is_completed = True
+            progress.completed_at = timezone.now()
+            progress._bitmap_recorded = True
+            progress.save(update_fields=['is_completed', 'completed_at'])
+
+            recorded = record_completion(self, progress.lesson_id)
+            if recorded is None:
+                # Lesson is outside the lesson index (e.g. its module is inactive)
+                if self.status != 'completed':
+                    self.update_progress()
+                else:
+                    Enrollment.objects.filter(pk=self.pk).update(progress_version=F('progress_version') + 1)
+                    self.progress_version += 1
+                return True
+
+            bitmap, index = recorded
+            bitmap_changes = {
+                'completion_bitmap': bitmap.to_bytes(),
+                'completion_bitmap_signature': index.signature,
+            }
+            # Completed courses stay completed; revisiting lessons doesn't change progress
+            if self.status != 'completed':
+                self.update_progress(bitmap.count(), len(index), **bitmap_changes)
+            else:
+                Enrollment.objects.filter(pk=self.pk).update(
+                    progress_version=F('progress_version') + 1, **bitmap_changes,
+                )
+                for field, value in bitmap_changes.items():
+                    setattr(self, field, value)
+                self.progress_version += 1
+        return True
 
 
 class Progress(models.Model):
@@ -293,11 +477,7 @@ class Progress(models.Model):
         return f"{self.enrollment.user.username} - {self.lesson.title}"
 
     def mark_completed(self):
-        if not self.is_completed:
-            self.is_completed = True
-            self.completed_at = timezone.now()
-            self.save()
-            self.enrollment.update_progress()
+        return self.enrollment.complete_lesson(self)
 
 
 class Certificate(models.Model):
@@ -356,4 +536,169 @@ class ContactMessage(models.Model):
     is_read = models.BooleanField(default=False)
 
     def __str__(self):
-        return f"Message from {self.name} - {self.subject}"
\ No newline at end of file
+        return f"Message from {self.name} - {self.subject}"
+
+
+class CacheGeneration(models.Model):
+    """Named counters bumped whenever the content behind cached pages changes (see App2/pagecache.py)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} generation {self.value}"
+
+
+class Job(models.Model):
+    """A queued side effect, run by `manage.py run_workers` (see App2/jobs.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher priorities are claimed first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running job whose lock has expired is handed to another worker
+    locked_until = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload of a lesson or task file (see App2/uploads.py)"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('completing', 'Completing'),
+        ('complete', 'Complete'),
+    ]
+    TARGET_CHOICES = [
+        ('lesson', 'Lesson file'),
+        ('task', 'Task file'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, related_name='upload_sessions', on_delete=models.CASCADE)
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Bytes written so far; the next chunk must start here
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    sha256 = models.CharField(max_length=64, blank=True)
+    stored_name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class QuizAttempt(models.Model):
+    """One sitting of a quiz by an enrolled learner (graded in App2/quizzes.py)"""
+    STATUS_CHOICES = [
+        ('in_progress', 'In Progress'),
+        ('submitted', 'Submitted'),
+        ('expired', 'Expired'),
+    ]
+
+    quiz = models.ForeignKey(Quiz, related_name='attempts', on_delete=models.CASCADE)
+    enrollment = models.ForeignKey(Enrollment, related_name='quiz_attempts', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
+    started_at = models.DateTimeField(default=timezone.now)
+    # Null when the quiz has no time limit
+    deadline = models.DateTimeField(blank=True, null=True)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    # The question set this attempt was graded against
+    quiz_version = models.PositiveIntegerField(default=1)
+    # Questions drawn for this attempt, in the order shown; empty means all of them
+    question_ids = models.JSONField(default=list, blank=True)
+    score = models.PositiveIntegerField(default=0)
+    max_score = models.PositiveIntegerField(default=0)
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    passed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['quiz', 'enrollment', 'status'], name='quizattempt_lookup_idx'),
+        ]
+        constraints = [
+            # One open attempt per learner and quiz
+            models.UniqueConstraint(
+                fields=['quiz', 'enrollment'], condition=Q(status='in_progress'), name='quizattempt_one_open',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.enrollment.user.username} - {self.quiz.title} ({self.status})"
+
+
+class QuizAnswer(models.Model):
+    attempt = models.ForeignKey(QuizAttempt, related_name='answers', on_delete=models.CASCADE)
+    question = models.ForeignKey(QuizQuestion, related_name='answers', on_delete=models.CASCADE)
+    # Option index for multiple choice, 'true'/'false', or the text typed in
+    response = models.CharField(max_length=500, blank=True)
+    is_correct = models.BooleanField(default=False)
+    points_awarded = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['attempt', 'question']
+
+    def __str__(self):
+        return f"{self.attempt_id} - Q{self.question_id}: {self.response}"
+
+
+class QuizStats(models.Model):
+    """Running totals behind a quiz's item analysis (see App2/item_analysis.py)"""
+    quiz = models.OneToOneField(Quiz, related_name='stats', on_delete=models.CASCADE)
+    # The question set the totals were built for; a new version rebuilds them
+    quiz_version = models.PositiveIntegerField(default=0)
+    # Attempts submitted up to here have been folded in
+    analyzed_through = models.DateTimeField(blank=True, null=True)
+    attempt_count = models.PositiveIntegerField(default=0)
+    total_sum = models.PositiveBigIntegerField(default=0)
+    total_sq_sum = models.PositiveBigIntegerField(default=0)
+    cronbach_alpha = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Stats for {self.quiz.title} ({self.attempt_count} attempts)"
+
+
+class QuizItemStats(models.Model):
+    """Difficulty and discrimination of one question, from its running totals"""
+    quiz_stats = models.ForeignKey(QuizStats, related_name='items', on_delete=models.CASCADE)
+    question = models.OneToOneField(QuizQuestion, related_name='stats', on_delete=models.CASCADE)
+    # Attempts the question was drawn for; unanswered counts as incorrect
+    attempt_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    score_sum = models.PositiveBigIntegerField(default=0)
+    score_sq_sum = models.PositiveBigIntegerField(default=0)
+    # Totals of the attempt scores, overall and over the correct answers
+    total_sum = models.PositiveBigIntegerField(default=0)
+    total_sq_sum = models.PositiveBigIntegerField(default=0)
+    correct_total_sum = models.PositiveBigIntegerField(default=0)
+    # {response: count}; option indexes for multiple choice
+    response_counts = models.JSONField(default=dict, blank=True)
+    p_value = models.FloatField(blank=True, null=True)
+    point_biserial = models.FloatField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Stats for Q{self.question_id}"
@@ -0,0 +1,328 @@
+import zlib
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, Sum, When
+from django.db.models.functions import Coalesce
+
+from .models import Course, Module, Lesson, Enrollment, Progress
+
+
+# Outline counters
+def refresh_module_stats(module_id):
+    """Recount the active lessons of one module and store them on the module row"""
+    stats = Lesson.objects.filter(module_id=module_id, is_active=True).aggregate(
+        lesson_count=Count('id'),
+        duration_minutes=Coalesce(Sum('duration_minutes'), 0),
+    )
+    Module.objects.filter(pk=module_id).update(**stats)
+
+
+def refresh_course_stats(course_id, bump_version=False):
+    """Roll the module counters of one course up onto the course row.
+
+    With ``bump_version`` the outline version is bumped in the same UPDATE.
+    """
+    stats = Module.objects.filter(course_id=course_id, is_active=True).aggregate(
+        total_modules=Count('id'),
+        total_lessons=Coalesce(Sum('lesson_count'), 0),
+        total_duration_minutes=Coalesce(Sum('duration_minutes'), 0),
+    )
+    if bump_version:
+        stats['outline_version'] = F('outline_version') + 1
+    Course.objects.filter(pk=course_id).update(**stats)
+
+
+def rebuild_all_stats():
+    """Recompute every module and course counter in a single aggregate pass.
+
+    Returns a ``(modules_changed, courses_changed)`` tuple.
+    """
+    lesson_totals = {
+        row['module_id']: row
+        for row in Lesson.objects.filter(is_active=True).values('module_id').annotate(
+            lesson_count=Count('id'),
+            duration_minutes=Coalesce(Sum('duration_minutes'), 0),
+        )
+    }
+
+    course_totals = {}
+    changed_modules = []
+    for module in Module.objects.only('id', 'course_id', 'is_active', 'lesson_count', 'duration_minutes'):
+        row = lesson_totals.get(module.id, {})
+        lesson_count = row.get('lesson_count', 0)
+        duration = row.get('duration_minutes', 0)
+        if (module.lesson_count, module.duration_minutes) != (lesson_count, duration):
+            module.lesson_count = lesson_count
+            module.duration_minutes = duration
+            changed_modules.append(module)
+        if module.is_active:
+            totals = course_totals.setdefault(module.course_id, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += lesson_count
+            totals[2] += duration
+
+    changed_courses = []
+    for course in Course.objects.only('id', 'total_modules', 'total_lessons', 'total_duration_minutes'):
+        totals = tuple(course_totals.get(course.id, (0, 0, 0)))
+        if (course.total_modules, course.total_lessons, course.total_duration_minutes) != totals:
+            course.total_modules, course.total_lessons, course.total_duration_minutes = totals
+            changed_courses.append(course)
+
+    Module.objects.bulk_update(changed_modules, ['lesson_count', 'duration_minutes'], batch_size=500)
+    Course.objects.bulk_update(
+        changed_courses, ['total_modules', 'total_lessons', 'total_duration_minutes'], batch_size=500
+    )
+    return len(changed_modules), len(changed_courses)
+
+
+def refresh_outline_stats(module_ids):
+    """Refresh the given modules and the courses they belong to, bumping their outline version"""
+    module_ids = {module_id for module_id in module_ids if module_id}
+    for module_id in module_ids:
+        refresh_module_stats(module_id)
+    course_ids = set(Module.objects.filter(pk__in=module_ids).values_list('course_id', flat=True))
+    for course_id in course_ids:
+        refresh_course_stats(course_id, bump_version=True)
+
+
+# Course outline cache
+# Entries are keyed by Course.outline_version, which every Module/Lesson/Task/Quiz
+# change bumps in the database. Every worker therefore sees a new key as soon as
+# the outline changes, whether the cache is per-process memory or shared.
+OUTLINE_KEY = 'outline:tree:{course_id}:{version}'
+LESSON_INDEX_KEY = 'outline:lesson_index:{course_id}:{version}'
+# Old versions are never read again; the timeout just lets them expire
+OUTLINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+OUTLINE_MODULE_FIELDS = ['id', 'title', 'description', 'order', 'lesson_count', 'duration_minutes']
+OUTLINE_LESSON_FIELDS = [
+    'id', 'module_id', 'title', 'description', 'content_type', 'duration_minutes', 'order', 'is_preview',
+]
+
+
+def bump_outline_version(course_id=None, module_id=None):
+    """Invalidate a course's cached outline, identified by course or by module"""
+    courses = Course.objects.filter(pk=course_id) if course_id else Course.objects.filter(modules__id=module_id)
+    courses.update(outline_version=F('outline_version') + 1)
+
+
+def build_course_outline(course_id):
+    """Active modules of a course, each with its active lessons, as plain dicts"""
+    modules = list(Module.objects.filter(course_id=course_id, is_active=True).order_by(
+        'order', 'id',
+    ).values(
+        *OUTLINE_MODULE_FIELDS,
+        # The module's active quiz, joined in rather than queried separately
+        quiz_id=Case(When(quiz__is_active=True, then=F('quiz__id'))),
+        quiz_title=Case(When(quiz__is_active=True, then=F('quiz__title'))),
+    ))
+    by_id = {module['id']: module for module in modules}
+    for module in modules:
+        module['lessons'] = []
+    for lesson in Lesson.objects.filter(module_id__in=by_id, is_active=True).order_by(
+        'order', 'id',
+    ).values(*OUTLINE_LESSON_FIELDS):
+        by_id[lesson['module_id']]['lessons'].append(lesson)
+    return {'course_id': course_id, 'modules': modules}
+
+
+def get_course_outline(course):
+    return get_outline(course.pk, course.outline_version)
+
+
+def get_outline(course_id, outline_version):
+    key = OUTLINE_KEY.format(course_id=course_id, version=outline_version)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_course_outline(course_id)
+        cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
+
+
+def copy_outline_modules(outline):
+    """Per-request copy of an outline's modules that views can annotate freely"""
+    return [
+        {**module, 'lessons': [dict(lesson) for lesson in module['lessons']]}
+        for module in outline['modules']
+    ]
+
+
+# Lesson gating index
+IndexedLesson = namedtuple('IndexedLesson', ['id', 'title', 'module_id'])
+
+
+class LessonIndex:
+    """Active lessons of a course in outline order (module order, then lesson order).
+
+    Lessons of inactive modules are left out, matching the outline counters.
+    """
+
+    def __init__(self, lessons):
+        self.lessons = list(lessons)
+        self.positions = {lesson.id: position for position, lesson in enumerate(self.lessons)}
+        # Changes whenever lessons are added, removed or reordered
+        self.signature = zlib.crc32(','.join(str(lesson.id) for lesson in self.lessons).encode())
+        # Position of the first lesson of each lesson's module, for module-scoped gating
+        self.module_starts = []
+        start = 0
+        for position, lesson in enumerate(self.lessons):
+            if position and lesson.module_id != self.lessons[position - 1].module_id:
+                start = position
+            self.module_starts.append(start)
+
+    def __len__(self):
+        return len(self.lessons)
+
+    def __contains__(self, lesson_id):
+        return lesson_id in self.positions
+
+    def position(self, lesson_id):
+        return self.positions.get(lesson_id)
+
+    def previous_in_module(self, lesson_id):
+        position = self.positions.get(lesson_id)
+        if position is None or position == self.module_starts[position]:
+            return None
+        return self.lessons[position - 1]
+
+    def next_in_module(self, lesson_id):
+        position = self.positions.get(lesson_id)
+        if position is None or position + 1 >= len(self.lessons):
+            return None
+        following = self.lessons[position + 1]
+        return following if following.module_id == self.lessons[position].module_id else None
+
+    def can_complete(self, lesson_id, completed_ids):
+        """A lesson unlocks once every earlier lesson of its module is completed"""
+        position = self.positions.get(lesson_id)
+        if position is None:
+            return True
+        return all(
+            lesson.id in completed_ids
+            for lesson in self.lessons[self.module_starts[position]:position]
+        )
+
+
+def build_lesson_index(outline):
+    return LessonIndex(
+        IndexedLesson(lesson['id'], lesson['title'], module['id'])
+        for module in outline['modules']
+        for lesson in module['lessons']
+    )
+
+
+def get_lesson_index(course):
+    key = LESSON_INDEX_KEY.format(course_id=course.pk, version=course.outline_version)
+    index = cache.get(key)
+    if index is None:
+        index = build_lesson_index(get_course_outline(course))
+        cache.set(key, index, OUTLINE_CACHE_TIMEOUT)
+    return index
+
+
+def get_completed_lessons(enrollment_id):
+    """Set of lesson ids the enrollment has completed, read from Progress rows"""
+    return frozenset(Progress.objects.filter(
+        enrollment_id=enrollment_id, is_completed=True,
+    ).values_list('lesson_id', flat=True))
+
+
+# Completion bitmaps
+class CompletionBitmap:
+    """Completed lessons of an enrollment, one bit per lesson index position"""
+
+    def __init__(self, data=b''):
+        self.data = bytearray(data or b'')
+
+    def add(self, position):
+        byte, bit = divmod(position, 8)
+        if byte >= len(self.data):
+            self.data.extend(bytes(byte + 1 - len(self.data)))
+        self.data[byte] |= 1 << bit
+
+    def __contains__(self, position):
+        byte, bit = divmod(position, 8)
+        return byte < len(self.data) and bool(self.data[byte] & (1 << bit))
+
+    def positions(self):
+        for byte_number, byte in enumerate(self.data):
+            while byte:
+                low_bit = byte & -byte
+                yield byte_number * 8 + low_bit.bit_length() - 1
+                byte ^= low_bit
+
+    def count(self):
+        return int.from_bytes(self.data, 'little').bit_count()
+
+    def to_bytes(self):
+        return bytes(self.data.rstrip(b'\x00'))
+
+    @classmethod
+    def from_lesson_ids(cls, lesson_ids, index):
+        bitmap = cls()
+        for lesson_id in lesson_ids:
+            position = index.position(lesson_id)
+            if position is not None:
+                bitmap.add(position)
+        return bitmap
+
+
+def record_completion(enrollment, lesson_id):
+    """Set a lesson's bit in the enrollment's bitmap; call inside a transaction.
+
+    The enrollment row is locked while the bitmap is read so concurrent
+    completions don't overwrite each other. A bitmap written against an older
+    outline is rebuilt from Progress rows first. Returns ``(bitmap, index)``,
+    or None when the lesson isn't part of the lesson index.
+    """
+    index = get_lesson_index(enrollment.course)
+    position = index.position(lesson_id)
+    if position is None:
+        return None
+
+    data, signature = Enrollment.objects.select_for_update().filter(pk=enrollment.pk).values_list(
+        'completion_bitmap', 'completion_bitmap_signature',
+    ).get()
+    if signature == index.signature:
+        bitmap = CompletionBitmap(data)
+    else:
+        bitmap = CompletionBitmap.from_lesson_ids(Progress.objects.filter(
+            enrollment_id=enrollment.pk, is_completed=True,
+        ).values_list('lesson_id', flat=True), index)
+    bitmap.add(position)
+    return bitmap, index
+
+
+def completed_lesson_ids(enrollment, index):
+    """Completed lesson ids, decoded from the bitmap when it matches the outline"""
+    if enrollment.completion_bitmap_signature == index.signature:
+        bitmap = CompletionBitmap(enrollment.completion_bitmap)
+        return frozenset(index.lessons[position].id for position in bitmap.positions()
+                         if position < len(index))
+    return get_completed_lessons(enrollment.pk)
+
+
+def invalidate_completion_bitmap(enrollment_id):
+    """Progress changed behind the bitmap's back: rebuild it on next use"""
+    Enrollment.objects.filter(pk=enrollment_id).update(
+        completion_bitmap_signature=0, progress_version=F('progress_version') + 1,
+    )
+
+
+def build_course_bitmaps(course_id):
+    """Expected bitmaps for every enrollment of a course, built from Progress rows.
+
+    Returns ``(index, {enrollment_id: bytes})``.
+    """
+    index = build_lesson_index(build_course_outline(course_id))
+    completed = defaultdict(list)
+    for enrollment_id, lesson_id in Progress.objects.filter(
+        enrollment__course_id=course_id, is_completed=True,
+    ).values_list('enrollment_id', 'lesson_id'):
+        completed[enrollment_id].append(lesson_id)
+
+    bitmaps = {}
+    for enrollment_id in Enrollment.objects.filter(course_id=course_id).values_list('id', flat=True):
+        bitmaps[enrollment_id] = CompletionBitmap.from_lesson_ids(completed[enrollment_id], index).to_bytes()
+    return index, bitmaps
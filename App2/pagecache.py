@@ -0,0 +1,122 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+
+from .models import CacheGeneration
+
+
+# Anonymous full-page cache
+# Pages are keyed by path, normalized query string and the course/outline/review
+# generations stored in the database, so a bump is seen by every worker at once
+# and old entries are simply never read again. Only requests without a session
+# or messages cookie are served, and a hit is answered before the session, CSRF,
+# auth and messages middleware run.
+PAGE_KEY = 'page:{generations}:{digest}'
+GENERATIONS = ['course', 'outline', 'review']
+
+# Campaign tracking parameters don't change the page
+IGNORED_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid'}
+IGNORED_PARAM_PREFIXES = ('utm_',)
+
+
+def cache_anonymous_page(view):
+    """Mark a function view as cacheable for anonymous visitors.
+
+    Class-based views set ``anonymous_page_cache = True`` instead.
+    """
+    view.anonymous_page_cache = True
+    return view
+
+
+def bump_generation(name):
+    if not CacheGeneration.objects.filter(name=name).update(value=F('value') + 1):
+        CacheGeneration.objects.get_or_create(name=name)
+
+
+def get_generation(name):
+    return CacheGeneration.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def current_generations():
+    values = dict(CacheGeneration.objects.values_list('name', 'value'))
+    return '.'.join(str(values.get(name, 0)) for name in GENERATIONS)
+
+
+def normalized_query(params):
+    return urlencode(sorted(
+        (key, value)
+        for key, values in params.lists()
+        for value in values
+        if value and key not in IGNORED_PARAMS and not key.startswith(IGNORED_PARAM_PREFIXES)
+    ))
+
+
+def page_cache_key(request):
+    page = f'{request.get_host()}{request.path}?{normalized_query(request.GET)}'
+    digest = hashlib.md5(page.encode()).hexdigest()
+    return PAGE_KEY.format(generations=current_generations(), digest=digest)
+
+
+def is_cacheable_view(request):
+    try:
+        view = resolve(request.path_info).func
+    except Resolver404:
+        return False
+    return getattr(view, 'anonymous_page_cache', False) or getattr(
+        getattr(view, 'view_class', None), 'anonymous_page_cache', False,
+    )
+
+
+def is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+        and is_cacheable_view(request)
+    )
+
+
+def is_cacheable_response(response):
+    # A response that sets a cookie (CSRF, session, messages) belongs to one visitor
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+class AnonymousPageCacheMiddleware:
+    """Serve marked views to anonymous visitors from the cache.
+
+    Goes above SessionMiddleware so hits skip the rest of the stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 0)
+        if not timeout or not is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content, headers=headers)
+            response['X-Page-Cache'] = 'hit'
+            # Stored pages keep the ETag their view computed
+            return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+        response = self.get_response(request)
+        if request.method == 'GET' and is_cacheable_response(response):
+            cache.set(key, (response.content, dict(response.items())), timeout)
+            response['X-Page-Cache'] = 'miss'
+        return response
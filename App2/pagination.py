@@ -0,0 +1,182 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+# Keyset (cursor) pagination
+def _cursor_value(value):
+    # Full precision: cursors compare for equality, so microseconds must survive
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def estimate_total(queryset, limit):
+    """Row count that stops at ``limit``: returns ``(total, exact)``.
+
+    Counts at most ``limit + 1`` rows. Past that PostgreSQL reports the
+    planner's row estimate; other databases report ``limit`` as a lower bound.
+    """
+    queryset = queryset.order_by()
+    total = queryset[:limit + 1].count()
+    if total <= limit:
+        return total, True
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        return max(int(plan[0]['Plan']['Plan Rows']), limit), False
+    return limit, False
+
+
+def cursor_querystring(params, cursor_param):
+    """The current query string without the cursor, for building pager links"""
+    return urlencode([(key, value) for key, value in params.items() if key != cursor_param])
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, total=None, total_exact=True):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # Set when the paginator was given a count_limit
+        self.total = total
+        self.total_exact = total_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """Paginates a queryset on a unique ordering instead of OFFSET.
+
+    ``ordering`` is a list of model field or annotation names, each optionally
+    prefixed with ``-``; the last one must be unique (normally ``id``/``-id``).
+    Pages are addressed by opaque cursors, so deep pages cost the same as the
+    first. With ``count_limit`` each page also carries an estimated total (see
+    ``estimate_total``).
+    """
+
+    def __init__(self, queryset, ordering, per_page, count_limit=None):
+        self.queryset = queryset
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.fields = [self._field(name) for name, _ in self.ordering]
+        self.per_page = per_page
+        self.count_limit = count_limit
+
+    def _field(self, name):
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # An annotation (e.g. a search rank): its value goes into the cursor as is
+            return None
+
+    def page(self, cursor=None):
+        try:
+            backwards, values = self.decode_cursor(cursor) if cursor else (False, None)
+        except InvalidCursor:
+            backwards, values = False, None
+
+        queryset = self.queryset.order_by(*self._order_by(reverse=backwards))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse=backwards))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1], backwards=False)
+            if (has_more and backwards) or (values is not None and not backwards):
+                previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        page = KeysetPage(rows, next_cursor, previous_cursor)
+        if self.count_limit:
+            page.total, page.total_exact = estimate_total(self.queryset, self.count_limit)
+        return page
+
+    def encode_cursor(self, obj, backwards):
+        if isinstance(obj, dict):
+            # Rows from a .values() queryset
+            values = [obj[name] for name, _ in self.ordering]
+        else:
+            values = [
+                field.value_from_object(obj) if field else getattr(obj, name)
+                for field, (name, _) in zip(self.fields, self.ordering)
+            ]
+        payload = json.dumps([1 if backwards else 0, values], default=_cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            return bool(direction), [self._to_python(field, value) for field, value in zip(self.fields, values)]
+        except (ValueError, TypeError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _to_python(self, field, value):
+        if field is not None:
+            return field.to_python(value)
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValidationError('Invalid cursor value')
+        return value
+
+    def _order_by(self, reverse):
+        return [('-' if descending != reverse else '') + name for name, descending in self.ordering]
+
+    def _after(self, values, reverse):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering"""
+        condition = Q()
+        for position in range(len(self.ordering) - 1, -1, -1):
+            name, descending = self.ordering[position]
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            if position < len(self.ordering) - 1:
+                step |= Q(**{name: values[position]}) & condition
+            condition = step
+        return condition
+
+
+class KeysetListMixin:
+    """Keyset pagination for ListView; use instead of ``paginate_by``.
+
+    Adds ``page`` (a KeysetPage) and ``page_query`` (the query string without
+    the cursor) to the context, and limits the object list to the page.
+    """
+    keyset_ordering = ['-created_at', '-id']
+    keyset_per_page = 20
+    keyset_count_limit = None
+    cursor_param = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def get_context_data(self, **kwargs):
+        queryset = kwargs.pop('object_list', self.object_list)
+        page = KeysetPaginator(
+            queryset, self.get_keyset_ordering(), self.keyset_per_page, count_limit=self.keyset_count_limit,
+        ).page(self.request.GET.get(self.cursor_param))
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        context['page'] = page
+        context['page_query'] = cursor_querystring(self.request.GET, self.cursor_param)
+        return context
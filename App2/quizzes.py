@@ -0,0 +1,245 @@
+import random
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Enrollment, QuizAnswer, QuizAttempt, QuizQuestion
+
+
+# Quiz grading
+# A quiz's answer key is built once per Quiz.version (bumped by every question
+# change) and cached as {question_id: (expected response, points)}, with every
+# expected response normalized the way submitted responses are. Grading an
+# attempt is then one pass over the submitted answers, one conditional UPDATE
+# of the attempt and one bulk INSERT of its answers, whatever the quiz length.
+ANSWER_KEY = 'quiz:answer_key:{quiz_id}:{version}'
+# Questions are drawn from a question bank cached the same way: a tuple of
+# BankQuestion in `order`. An attempt's draw (Quiz.draw_count of them, or all)
+# and its option order are seeded by the attempt id, so they are reproduced
+# from the bank on every page view without touching the database.
+QUESTION_BANK = 'quiz:question_bank:{quiz_id}:{version}'
+# Old versions are never read again; the timeout just lets them expire
+QUIZ_CACHE_TIMEOUT = 60 * 60 * 24
+
+BankQuestion = namedtuple('BankQuestion', 'id question_type question_text options points explanation')
+
+
+def normalize_response(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def correct_option(options, correct_answer):
+    """Index of the correct option, as a string.
+
+    correct_answer is the option's text, or else its 0-based index.
+    """
+    expected = normalize_response(correct_answer)
+    for index, option in enumerate(options):
+        if normalize_response(option) == expected:
+            return str(index)
+    if expected.isdigit() and int(expected) < len(options):
+        return expected
+    return None
+
+
+def build_answer_key(quiz_id):
+    answer_key = {}
+    for question_id, question_type, options, correct_answer, points in QuizQuestion.objects.filter(
+        quiz_id=quiz_id,
+    ).values_list('id', 'question_type', 'options', 'correct_answer', 'points'):
+        if question_type == 'multiple_choice' and options:
+            # Multiple choice answers are submitted as option indexes
+            expected = correct_option(options, correct_answer)
+        else:
+            expected = normalize_response(correct_answer)
+        answer_key[question_id] = (expected, points)
+    return answer_key
+
+
+def build_question_bank(quiz_id):
+    return tuple(
+        BankQuestion(question_id, question_type, text, tuple(options or ()), points, explanation)
+        for question_id, question_type, text, options, points, explanation in QuizQuestion.objects.filter(
+            quiz_id=quiz_id,
+        ).order_by('order', 'id').values_list(
+            'id', 'question_type', 'question_text', 'options', 'points', 'explanation',
+        )
+    )
+
+
+def cached_for_version(key, quiz_id, version, build):
+    key = key.format(quiz_id=quiz_id, version=version)
+    value = cache.get(key)
+    if value is None:
+        value = build(quiz_id)
+        cache.set(key, value, QUIZ_CACHE_TIMEOUT)
+    return value
+
+
+def get_answer_key(quiz_id, version):
+    return cached_for_version(ANSWER_KEY, quiz_id, version, build_answer_key)
+
+
+def get_question_bank(quiz_id, version):
+    return cached_for_version(QUESTION_BANK, quiz_id, version, build_question_bank)
+
+
+def draw_questions(bank, attempt_id, draw_count):
+    """Question ids for an attempt: a seeded sample of ``draw_count``, or the whole bank in order"""
+    if draw_count and draw_count < len(bank):
+        return [question.id for question in random.Random(attempt_id).sample(bank, draw_count)]
+    return [question.id for question in bank]
+
+
+def question_count(quiz):
+    """Questions each attempt at a quiz is asked"""
+    bank = get_question_bank(quiz.pk, quiz.version)
+    return min(quiz.draw_count, len(bank)) if quiz.draw_count else len(bank)
+
+
+def option_order(attempt_id, question, shuffle):
+    """``(option index, option)`` pairs as shown to one attempt.
+
+    The index is what the form submits, so a shuffled order still grades
+    against the stored options. Each question is seeded on its own so its
+    order survives other questions changing.
+    """
+    options = list(enumerate(question.options))
+    if shuffle:
+        random.Random(f'{attempt_id}:{question.id}').shuffle(options)
+    return options
+
+
+def attempt_questions(attempt):
+    """An attempt's questions from the cached bank, in the order drawn.
+
+    ``attempt.quiz`` should be loaded already. Questions deleted since the
+    attempt started are left out.
+    """
+    quiz = attempt.quiz
+    bank = {question.id: question for question in get_question_bank(quiz.pk, quiz.version)}
+    question_ids = attempt.question_ids or list(bank)
+    return [
+        (bank[question_id], option_order(attempt.pk, bank[question_id], quiz.shuffle_options))
+        for question_id in question_ids if question_id in bank
+    ]
+
+
+def grade(answer_key, responses, question_ids=None):
+    """Score ``{question_id: response}`` against an answer key.
+
+    Only ``question_ids`` count when given, for attempts that drew part of the
+    quiz. Returns ``(unsaved QuizAnswer list, score, max score)``. Questions
+    left unanswered score nothing; responses to unknown questions are ignored.
+    """
+    if question_ids:
+        answer_key = {
+            question_id: answer_key[question_id] for question_id in question_ids if question_id in answer_key
+        }
+    answers = []
+    score = 0
+    for question_id, (expected, points) in answer_key.items():
+        response = responses.get(question_id)
+        if response is None:
+            continue
+        response = str(response)[:500]
+        is_correct = expected is not None and normalize_response(response) == expected
+        awarded = points if is_correct else 0
+        score += awarded
+        answers.append(QuizAnswer(
+            question_id=question_id, response=response, is_correct=is_correct, points_awarded=awarded,
+        ))
+    return answers, score, sum(points for _, points in answer_key.values())
+
+
+def percentage_of(score, max_score):
+    if not max_score:
+        return Decimal('0.00')
+    return (Decimal(score * 100) / Decimal(max_score)).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+
+
+def start_attempt(quiz, enrollment):
+    """The learner's open attempt at a quiz, or a new one with its deadline set"""
+    try:
+        return open_attempt(quiz, enrollment)
+    except IntegrityError:
+        # A concurrent start won; SQLite has no row locks, so only the constraint caught it
+        return QuizAttempt.objects.get(quiz=quiz, enrollment=enrollment, status='in_progress')
+
+
+def open_attempt(quiz, enrollment):
+    now = timezone.now()
+    with transaction.atomic():
+        # Serializes starts per enrollment, so a double click can't open two attempts
+        Enrollment.objects.select_for_update().filter(pk=enrollment.pk).values_list('pk', flat=True).get()
+        attempt = QuizAttempt.objects.filter(quiz=quiz, enrollment=enrollment, status='in_progress').first()
+        if attempt is not None and not is_overdue(attempt, now):
+            return attempt
+        if attempt is not None:
+            expire(attempt, now)
+        deadline = now + timedelta(minutes=quiz.time_limit_minutes) if quiz.time_limit_minutes else None
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz, enrollment=enrollment, started_at=now, deadline=deadline, quiz_version=quiz.version,
+        )
+        # The draw is seeded by the attempt id, so it can only be made once the row exists
+        attempt.question_ids = draw_questions(get_question_bank(quiz.pk, quiz.version), attempt.pk, quiz.draw_count)
+        QuizAttempt.objects.filter(pk=attempt.pk).update(question_ids=attempt.question_ids)
+    return attempt
+
+
+def is_overdue(attempt, now):
+    # The grace period absorbs the time a submission spends in transit
+    grace = timedelta(seconds=settings.QUIZ_SUBMIT_GRACE_SECONDS)
+    return attempt.deadline is not None and now > attempt.deadline + grace
+
+
+def expire(attempt, now):
+    QuizAttempt.objects.filter(pk=attempt.pk, status='in_progress').update(status='expired', submitted_at=now)
+    attempt.status, attempt.submitted_at = 'expired', now
+
+
+def submit_attempt(attempt, responses):
+    """Grade and close an attempt; ``attempt.quiz`` should be loaded already.
+
+    Submissions past the deadline expire the attempt without scoring it.
+    Returns False if the attempt was no longer open.
+    """
+    now = timezone.now()
+    if attempt.status != 'in_progress':
+        return False
+    if is_overdue(attempt, now):
+        expire(attempt, now)
+        return True
+
+    quiz = attempt.quiz
+    answers, score, max_score = grade(get_answer_key(quiz.pk, quiz.version), responses, attempt.question_ids)
+    percentage = percentage_of(score, max_score)
+    changes = {
+        'status': 'submitted', 'submitted_at': now, 'quiz_version': quiz.version, 'score': score,
+        'max_score': max_score, 'percentage': percentage, 'passed': percentage >= quiz.passing_score,
+    }
+    with transaction.atomic():
+        # Conditional on the status, so a double submit can't record answers twice
+        if not QuizAttempt.objects.filter(pk=attempt.pk, status='in_progress').update(**changes):
+            return False
+        for answer in answers:
+            answer.attempt_id = attempt.pk
+        QuizAnswer.objects.bulk_create(answers)
+    for field, value in changes.items():
+        setattr(attempt, field, value)
+    return True
+
+
+def responses_from(data):
+    """``{question_id: response}`` from ``question_<id>`` form fields"""
+    responses = {}
+    for name, value in data.items():
+        prefix, _, question_id = name.partition('_')
+        if prefix == 'question' and question_id.isdigit():
+            responses[int(question_id)] = value
+    return responses
@@ -0,0 +1,36 @@
+from collections import defaultdict
+
+from django.db.models import Count, F
+
+from .models import Course, Review
+
+
+# Course rating summaries
+def apply_rating(course_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one rating from a course's summary in one UPDATE"""
+    Course.objects.filter(pk=course_id).update(**{
+        'rating_count': F('rating_count') + sign,
+        'rating_sum': F('rating_sum') + sign * rating,
+        f'ratings_{rating}': F(f'ratings_{rating}') + sign,
+    })
+
+
+def rebuild_rating_summaries():
+    """Recompute every course's rating summary with one grouped query; returns courses changed"""
+    histograms = defaultdict(dict)
+    for row in Review.objects.values('course_id', 'rating').annotate(count=Count('id')).order_by():
+        histograms[row['course_id']][row['rating']] = row['count']
+
+    fields = ['rating_count', 'rating_sum'] + [f'ratings_{stars}' for stars in range(1, 6)]
+    changed = []
+    for course in Course.objects.only('id', *fields):
+        histogram = histograms.get(course.id, {})
+        expected = {f'ratings_{stars}': histogram.get(stars, 0) for stars in range(1, 6)}
+        expected['rating_count'] = sum(histogram.values())
+        expected['rating_sum'] = sum(stars * count for stars, count in histogram.items())
+        if any(getattr(course, field) != value for field, value in expected.items()):
+            for field, value in expected.items():
+                setattr(course, field, value)
+            changed.append(course)
+    Course.objects.bulk_update(changed, fields, batch_size=500)
+    return len(changed)
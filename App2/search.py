@@ -0,0 +1,164 @@
+import re
+
+from django.db import connection
+from django.db.models import Q, F, FloatField, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Course
+
+
+# Course search backends
+# SQLite uses an FTS5 table (App2_course_fts, rowid = course id), PostgreSQL the
+# Course.search_vector column with a GIN index; any other database falls back to
+# icontains. All three annotate search_rank and search_snippet.
+SEARCH_FIELDS = ['title', 'short_description', 'description', 'instructor']
+FTS_TABLE = 'App2_course_fts'
+
+# Snippets are highlighted with these control characters first and turned into
+# <mark> only after the text around them has been escaped.
+MARK_START, MARK_END = '\x02', '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    return TOKEN_RE.findall(query.lower())[:10]
+
+
+def no_results(queryset):
+    """An empty result that still has the annotations callers order and render by"""
+    return queryset.none().annotate(
+        search_rank=Value(0.0, output_field=FloatField()),
+        search_snippet=F('short_description'),
+    )
+
+
+def highlight(snippet):
+    """Escape a snippet and turn its highlight markers into <mark> tags"""
+    if not snippet:
+        return ''
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class IContainsSearchBackend:
+    """The original substring search over the course text columns, unranked"""
+
+    def search(self, queryset, query):
+        query = query.strip()
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(instructor__icontains=query)
+        ).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=F('short_description'),
+        ).order_by('-created_at', '-id')
+
+    def index_course(self, course):
+        pass
+
+    def remove_course(self, course_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTSSearchBackend:
+    """FTS5 with bm25 ranking (title weighted highest) and prefix matching"""
+
+    # bm25() column weights, in SEARCH_FIELDS order
+    WEIGHTS = '10.0, 4.0, 1.0, 2.0'
+
+    def match_expression(self, query):
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return no_results(queryset)
+        # Joined rather than correlated: bm25() and snippet() are then computed
+        # in the same FTS5 scan as the MATCH, once per matching course. The rank
+        # is an annotation so keyset pagination can filter on it.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "{Course._meta.db_table}"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).annotate(
+            # bm25() is lower for better matches
+            search_rank=RawSQL(f'-bm25({FTS_TABLE}, {self.WEIGHTS})', [], output_field=FloatField()),
+            search_snippet=RawSQL(
+                f"snippet({FTS_TABLE}, -1, %s, %s, '…', 24)", [MARK_START, MARK_END], output_field=TextField(),
+            ),
+        ).order_by('-search_rank', '-id')
+
+    def index_course(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(SEARCH_FIELDS)}) VALUES (%s, %s, %s, %s, %s)',
+                [course.pk] + [getattr(course, field) or '' for field in SEARCH_FIELDS],
+            )
+
+    def remove_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course_id])
+
+    def rebuild(self):
+        columns = ', '.join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM "{Course._meta.db_table}"'
+            )
+
+
+class PostgresSearchBackend:
+    """tsvector/GIN search with ts_rank ordering, prefix matching and ts_headline"""
+
+    CONFIG = 'english'
+
+    def search_vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector('title', weight='A', config=self.CONFIG) +
+            SearchVector('short_description', weight='B', config=self.CONFIG) +
+            SearchVector('instructor', weight='B', config=self.CONFIG) +
+            SearchVector('description', weight='C', config=self.CONFIG)
+        )
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+
+        terms = search_terms(query)
+        if not terms:
+            return no_results(queryset)
+        search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=self.CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+            search_snippet=SearchHeadline(
+                'description', search_query, config=self.CONFIG,
+                start_sel=MARK_START, stop_sel=MARK_END, max_words=30, min_words=15,
+            ),
+        ).order_by('-search_rank', '-id')
+
+    def index_course(self, course):
+        Course.objects.filter(pk=course.pk).update(search_vector=self.search_vector())
+
+    def remove_course(self, course_id):
+        pass
+
+    def rebuild(self):
+        Course.objects.update(search_vector=self.search_vector())
+
+
+def get_search_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IContainsSearchBackend()
@@ -0,0 +1,184 @@
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    UserProfile, Course, Module, Task, Quiz, QuizQuestion, Lesson, Enrollment, Progress, Review, Certificate,
+)
+from .outline import (
+    refresh_outline_stats, refresh_module_stats, refresh_course_stats,
+    bump_outline_version, invalidate_completion_bitmap,
+)
+from .dashboard import invalidate_dashboard
+from .ratings import apply_rating
+from .search import get_search_backend
+from .facets import invalidate_facets
+from .pagecache import bump_generation
+from .jobs import enqueue
+from .certificates import issue_certificate
+
+
+# Outline counters and outline version: keep them in sync with the outline
+@receiver(post_init, sender=Lesson)
+def remember_lesson_module(sender, instance, **kwargs):
+    instance._original_module_id = instance.module_id
+
+
+@receiver(post_init, sender=Module)
+def remember_module_course(sender, instance, **kwargs):
+    instance._original_course_id = instance.course_id
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_outline_changed(sender, instance, **kwargs):
+    refresh_outline_stats([instance.module_id, instance._original_module_id])
+    instance._original_module_id = instance.module_id
+    bump_generation('outline')
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_outline_changed(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_save:
+        # A stale instance may have written old counters back, so recount
+        refresh_module_stats(instance.pk)
+    for course_id in {instance.course_id, instance._original_course_id}:
+        if course_id:
+            refresh_course_stats(course_id, bump_version=True)
+    instance._original_course_id = instance.course_id
+    bump_generation('outline')
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def module_content_changed(sender, instance, **kwargs):
+    bump_outline_version(module_id=instance.module_id)
+    bump_generation('outline')
+
+
+# Quiz answer keys are cached per Quiz.version
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def quiz_question_changed(sender, instance, **kwargs):
+    Quiz.objects.filter(pk=instance.quiz_id).update(version=F('version') + 1)
+
+
+# Completion bitmap: Progress edits made outside Enrollment.complete_lesson()
+@receiver(post_init, sender=Progress)
+def remember_progress_state(sender, instance, **kwargs):
+    instance._original_is_completed = instance.is_completed
+
+
+@receiver(post_save, sender=Progress)
+@receiver(post_delete, sender=Progress)
+def progress_changed(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_delete:
+        changed = instance._original_is_completed or instance.is_completed
+    elif kwargs.get('created'):
+        changed = instance.is_completed
+    else:
+        changed = instance.is_completed != instance._original_is_completed
+    if not changed:
+        return
+    instance._original_is_completed = instance.is_completed
+
+    # Enrollment.complete_lesson() writes the bitmap and refreshes the dashboard itself
+    if not getattr(instance, '_bitmap_recorded', False):
+        invalidate_completion_bitmap(instance.enrollment_id)
+        user_id = Enrollment.objects.filter(pk=instance.enrollment_id).values_list('user_id', flat=True).first()
+        if user_id:
+            invalidate_dashboard(user_id)
+
+
+# Dashboard snapshots
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_dashboard(instance.user_id)
+
+
+# Certificates: completions written by Enrollment.update_progress() issue their
+# own, this covers status changes saved directly (e.g. by staff)
+@receiver(post_save, sender=Enrollment)
+def enrollment_completed(sender, instance, **kwargs):
+    if instance.status == 'completed' and not instance.certificate_issued:
+        issue_certificate(instance)
+
+
+# Cached verification answers are keyed by the 'certificate' generation
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def certificate_changed(sender, instance, **kwargs):
+    bump_generation('certificate')
+
+
+# Course rating summaries
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._original_rating = (instance.course_id, instance.rating)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    current = (instance.course_id, instance.rating)
+    if created:
+        apply_rating(*current, 1)
+    elif current != instance._original_rating:
+        apply_rating(*instance._original_rating, -1)
+        apply_rating(*current, 1)
+    instance._original_rating = current
+    # Review text is shown on the course page, so any save counts
+    bump_generation('review')
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_rating(*instance._original_rating, -1)
+    bump_generation('review')
+
+
+# Course search index, catalog facets and cached pages
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    get_search_backend().index_course(instance)
+    invalidate_facets()
+    bump_generation('course')
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    get_search_backend().remove_course(instance.pk)
+    invalidate_facets()
+    bump_generation('course')
+
+
+# Responsive image derivatives, built once the upload is committed
+def image_names(instance):
+    # Deferred fields (e.g. from .only()) are left unknown instead of loaded
+    deferred = instance.get_deferred_fields()
+    return [None if field in deferred else getattr(instance, field).name or '' for field in instance.IMAGE_FIELDS]
+
+
+@receiver(post_init, sender=Course)
+@receiver(post_init, sender=UserProfile)
+def remember_images(sender, instance, **kwargs):
+    instance._original_images = image_names(instance)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=UserProfile)
+def images_saved(sender, instance, created, **kwargs):
+    images = image_names(instance)
+    if created:
+        changed = any(images)
+    else:
+        changed = any(
+            new != old for new, old in zip(images, instance._original_images) if None not in (new, old)
+        )
+    instance._original_images = images
+    if changed:
+        # Resizing takes seconds per upload, so it runs on a worker
+        enqueue('refresh_image_variants', {'model': sender.__name__, 'pk': instance.pk})
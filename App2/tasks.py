@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.core.mail import EmailMultiAlternatives
+
+from .certificates import certificate_rows, record_files, store_certificate
+from .images import refresh_image_variants
+from .jobs import task
+from .models import Certificate, Course
+from .pagecache import bump_generation
+
+
+# Job handlers
+# Payloads are JSON, so handlers take primary keys and strings, never instances.
+@task('send_email')
+def send_email(subject, body, to, from_email=None, html_body=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_body:
+        message.attach_alternative(html_body, 'text/html')
+    message.send()
+
+
+@task('refresh_image_variants')
+def refresh_images(model, pk):
+    """Rebuild responsive derivatives for one Course or UserProfile"""
+    model = apps.get_model('App2', model)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is not None and refresh_image_variants(instance, model.IMAGE_FIELDS) and model is Course:
+        # Pages cached since the upload were rendered without the srcsets;
+        # profile photos never appear on anonymous pages
+        bump_generation('course')
+
+
+@task('render_certificate')
+def render_certificate(certificate_pk):
+    row = certificate_rows(Certificate.objects.filter(pk=certificate_pk)).first()
+    if row is not None:
+        record_files(dict([store_certificate(row)]))
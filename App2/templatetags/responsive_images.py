@@ -0,0 +1,39 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from App2.images import derivative_name, is_current
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(obj, field_name, sizes='100vw', **attrs):
+    """<picture> with WebP and JPEG srcsets for an image field.
+
+    Falls back to a plain <img> of the original while derivatives are missing
+    or were built for a previous upload. Extra keyword arguments become <img>
+    attributes, e.g. ``{% responsive_image course 'thumbnail' '25vw' class='card-img-top' alt=course.title %}``.
+    """
+    fieldfile = getattr(obj, field_name)
+    if not fieldfile:
+        return ''
+    attributes = format_html_join('', ' {}="{}"', attrs.items())
+    variants = getattr(obj, 'image_variants', None)
+    entry = variants.get(field_name) if is_current(variants, field_name, fieldfile.name) else None
+    if not entry or not entry['widths']:
+        return format_html('<img src="{}"{}>', fieldfile.url, attributes)
+
+    storage = fieldfile.storage
+
+    def srcset(extension, original=False):
+        candidates = [f"{storage.url(derivative_name(fieldfile.name, width, extension))} {width}w"
+                      for width in entry['widths']]
+        if original:
+            candidates.append(f"{fieldfile.url} {entry['width']}w")
+        return ', '.join(candidates)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        srcset('webp'), sizes, fieldfile.url, srcset('jpg', original=True), sizes, attributes,
+    )
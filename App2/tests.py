@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import (
+    Course, Module, Lesson, Task, Quiz, QuizQuestion, QuizAttempt, QuizAnswer, QuizStats, Discussion, DiscussionReply,
+    Enrollment, Progress, Certificate, Job, UploadSession,
+)
+from .downloads import can_access, parse_range
+from .item_analysis import answer_sums, refresh_quiz_stats
+from .jobs import claim_jobs, enqueue, purge_finished_jobs, run_job
+from .outline import CompletionBitmap, get_course_outline, get_lesson_index, get_outline
+from .pagination import InvalidCursor, KeysetPaginator
+from .quizzes import attempt_questions
+
+
+def create_course(title='Course', **fields):
+    """A course with its required text fields filled in"""
+    fields = {
+        'slug': slugify(title), 'description': 'Description', 'short_description': 'Short', 'instructor': 'Instructor',
+        **fields,
+    }
+    return Course.objects.create(title=title, **fields)
+
+
+class AdminCourseQueryBudgetTests(TestCase):
+    """The admin course pages must not issue queries per course, module or discussion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.learner = User.objects.create_user('learner', 'learner@example.com', 'pass12345')
+        cls.course = cls.add_course('Course 0')
+
+    @classmethod
+    def add_course(cls, title, modules=2):
+        course = create_course(title, thumbnail='courses/thumbnails/test.jpg')
+        for module_order in range(modules):
+            module = Module.objects.create(course=course, title=f'Module {module_order}', order=module_order)
+            for order in range(3):
+                Lesson.objects.create(module=module, title=f'Lesson {order}', order=order)
+                Task.objects.create(module=module, title=f'Task {order}', order=order)
+            Quiz.objects.create(module=module, title=f'Quiz {module_order}')
+        discussion = Discussion.objects.create(course=course, user=cls.learner, title='Question', content='?')
+        DiscussionReply.objects.create(discussion=discussion, user=cls.admin, content='!')
+        Enrollment.objects.create(user=cls.learner, course=course)
+        return course
+
+    def count_queries(self, url):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_course_management_query_count_is_constant(self):
+        url = reverse('admin_course_management')
+        small_catalog, _ = self.count_queries(url)
+        for number in range(1, 6):
+            self.add_course(f'Course {number}')
+        large_catalog, response = self.count_queries(url)
+
+        self.assertEqual(small_catalog, large_catalog)
+        self.assertLessEqual(large_catalog, 4)
+        course = next(course for course in response.context['courses'] if course.pk == self.course.pk)
+        self.assertEqual((course.total_modules, course.total_lessons), (2, 6))
+        self.assertEqual((course.task_count, course.enrollment_count), (6, 1))
+
+    def test_course_detail_query_count_is_constant(self):
+        small_course, _ = self.count_queries(reverse('admin_course_detail', args=[self.course.pk]))
+        large = self.add_course('Large course', modules=8)
+        for number in range(5):
+            discussion = Discussion.objects.create(course=large, user=self.learner, title=f'Q{number}', content='?')
+            DiscussionReply.objects.create(discussion=discussion, user=self.admin, content='!')
+        large_course, response = self.count_queries(reverse('admin_course_detail', args=[large.pk]))
+
+        self.assertEqual(small_course, large_course)
+        self.assertLessEqual(large_course, 6)
+        self.assertEqual(response.context['total_modules'], 8)
+        self.assertEqual(response.context['total_tasks'], 24)
+        self.assertEqual(response.context['total_enrollments'], 1)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class CatalogAPIQueryBudgetTests(TestCase):
+    """The JSON API serializes from .values() and must not query per course or enrollment"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user('learner', 'learner@example.com', 'pass12345')
+        cls.courses = [cls.add_course(number) for number in range(3)]
+
+    @classmethod
+    def add_course(cls, number):
+        course = create_course(f'Course {number}', thumbnail='courses/thumbnails/test.jpg')
+        module = Module.objects.create(course=course, title='Module', order=0)
+        lessons = [Lesson.objects.create(module=module, title=f'Lesson {order}', order=order) for order in range(2)]
+        enrollment = Enrollment.objects.create(user=cls.learner, course=course)
+        enrollment.complete_lesson(Progress.objects.create(enrollment=enrollment, lesson=lessons[0]))
+        return course
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+        self.assertEqual(response.status_code, 200)
+        return len(queries), json.loads(content)
+
+    def test_course_list_query_count_is_constant(self):
+        small_catalog, _ = self.count_queries(reverse('api_course_list'))
+        for number in range(3, 8):
+            self.add_course(number)
+        large_catalog, data = self.count_queries(reverse('api_course_list'))
+
+        self.assertEqual(small_catalog, large_catalog)
+        self.assertLessEqual(large_catalog, 2)
+        self.assertEqual((data['total'], data['total_exact']), (8, True))
+        self.assertEqual(data['results'][0]['total_lessons'], 2)
+
+    def test_course_list_pages_with_cursors(self):
+        first, data = self.count_queries(reverse('api_course_list') + '?limit=2')
+        _, second = self.count_queries(reverse('api_course_list') + f"?limit=2&cursor={data['next']}")
+
+        ids = [row['id'] for row in data['results'] + second['results']]
+        self.assertEqual(ids, [course.pk for course in reversed(self.courses)])
+        self.assertIsNone(second['next'])
+
+    def test_course_detail_includes_outline(self):
+        queries, data = self.count_queries(reverse('api_course_detail', args=[self.courses[0].pk]))
+
+        self.assertLessEqual(queries, 3)
+        self.assertEqual([len(module['lessons']) for module in data['modules']], [2])
+
+    def test_course_detail_not_found(self):
+        inactive = create_course('Hidden', is_active=False)
+        for timeout in (0, 60):
+            for pk in (inactive.pk, 0):
+                with self.subTest(timeout=timeout, pk=pk), override_settings(API_CACHE_TIMEOUT=timeout):
+                    response = self.client.get(reverse('api_course_detail', args=[pk]))
+                    self.assertEqual(response.status_code, 404)
+                    self.assertEqual(json.loads(response.content), {'error': 'Not found'})
+
+    def test_export_streams_every_course_in_one_query(self):
+        queries, data = self.count_queries(reverse('api_course_export'))
+
+        self.assertEqual(queries, 1)
+        self.assertEqual(len(data), 3)
+
+    def test_enrollments_query_count_is_constant(self):
+        self.client.force_login(self.learner)
+        small, _ = self.count_queries(reverse('api_enrollments'))
+        for number in range(3, 8):
+            self.add_course(number)
+        large, data = self.count_queries(reverse('api_enrollments'))
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)
+        self.assertEqual(len(data['results']), 8)
+        self.assertEqual(len(data['results'][0]['completed_lessons']), 1)
+
+
+
+@override_settings(API_CACHE_TIMEOUT=0, CATALOG_FACETS_TIMEOUT=0)
+class CourseSearchTests(TestCase):
+    """Queries without word characters search for nothing instead of failing to order by rank"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = create_course('Python Basics')
+        create_course('Cooking')
+
+    def get(self, name, search):
+        response = self.client.get(reverse(name), {'search': search})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_ranked_search(self):
+        response = self.get('course_list', 'pyth')
+        self.assertEqual(list(response.context['courses']), [self.course])
+        data = json.loads(self.get('api_course_list', 'pyth').content)
+        self.assertEqual([row['id'] for row in data['results']], [self.course.pk])
+
+    def test_whitespace_only_query_shows_the_catalog(self):
+        self.assertEqual(len(self.get('course_list', '   ').context['courses']), 2)
+        self.assertEqual(len(json.loads(self.get('api_course_list', ' ').content)['results']), 2)
+
+    def test_punctuation_only_query_finds_nothing(self):
+        for search in ['"', '?!', '" *']:
+            with self.subTest(search=search):
+                self.assertEqual(list(self.get('course_list', search).context['courses']), [])
+                self.assertEqual(json.loads(self.get('api_course_list', search).content)['results'], [])
+                export = self.get('api_course_export', search)
+                self.assertEqual(json.loads(b''.join(export.streaming_content)), [])
+
+
+class ConditionalGetTests(TestCase):
+    """Course, catalog and lesson pages answer a matching If-None-Match with 304 until what they show changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user('conditional', 'conditional@example.com', 'pass12345')
+        cls.course = create_course()
+        module = Module.objects.create(course=cls.course, title='Module', order=0)
+        cls.lessons = [Lesson.objects.create(module=module, title=f'Lesson {order}', order=order) for order in range(2)]
+        cls.enrollment = Enrollment.objects.create(user=cls.learner, course=cls.course)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.learner)
+
+    def etag(self, url):
+        # The first response may set the CSRF cookie, which is part of the ETag
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        return response['ETag']
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, headers={'If-None-Match': etag}).status_code
+
+    def assertRevalidates(self, url, change):
+        etag = self.etag(url)
+        self.assertEqual(self.revalidate(url, etag), 304)
+        change()
+        self.assertEqual(self.revalidate(url, etag), 200)
+
+    def test_course_detail(self):
+        self.assertRevalidates(
+            reverse('course_detail', args=[self.course.pk]),
+            lambda: Lesson.objects.create(module=self.lessons[0].module, title='New', order=2),
+        )
+
+    def test_catalog(self):
+        def retitle():
+            self.course.title = 'Renamed'
+            self.course.save()
+        self.assertRevalidates(reverse('course_list'), retitle)
+
+    def test_lesson(self):
+        url = reverse('lesson_view', args=[self.enrollment.pk, self.lessons[1].pk])
+        self.assertRevalidates(url, lambda: self.enrollment.complete_lesson(
+            Progress.objects.get_or_create(enrollment=self.enrollment, lesson=self.lessons[0])[0],
+        ))
+
+    def test_flash_messages_are_shown_once_then_etags_resume(self):
+        first = reverse('lesson_view', args=[self.enrollment.pk, self.lessons[0].pk])
+        self.client.get(first)
+        response = self.client.post(first, {'mark_complete': '1'}, follow=True)
+        self.assertContains(response, 'marked as completed')
+        self.assertFalse(response.has_header('ETag'))
+
+        url = reverse('lesson_view', args=[self.enrollment.pk, self.lessons[1].pk])
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertNotContains(response, 'marked as completed')
+        self.assertEqual(self.revalidate(url, response['ETag']), 304)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class AnonymousPageCacheTests(TestCase):
+    """Anonymous pages are served from the cache until a content change bumps a generation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = create_course('Cached Course')
+        cls.module = Module.objects.create(course=cls.course, title='Module', order=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_course_change_re_renders_pages(self):
+        for url in [reverse('course_detail', args=[self.course.pk]), reverse('course_list')]:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url)['X-Page-Cache'], 'miss')
+                self.assertEqual(self.get(url + '?utm_source=mail')['X-Page-Cache'], 'hit')
+
+                self.course.title = f'Renamed for {url}'
+                self.course.save()
+                response = self.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'miss')
+                self.assertContains(response, f'Renamed for {url}')
+
+    def test_outline_change_re_renders_the_course_page(self):
+        url = reverse('course_detail', args=[self.course.pk])
+        self.get(url)
+        Lesson.objects.create(module=self.module, title='Freshly added lesson', order=0)
+        response = self.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Freshly added lesson')
+
+    def test_signed_in_visitors_bypass_the_cache(self):
+        self.client.force_login(User.objects.create_user('member', 'member@example.com', 'pass12345'))
+        self.assertFalse(self.get(reverse('course_list')).has_header('X-Page-Cache'))
+
+class CertificateVerificationTests(TestCase):
+    """Verification resolves many ids with one query and caches every answer until a certificate changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        learner = User.objects.create_user('holder', 'holder@example.com', 'pass12345', first_name='Ada')
+        cls.certificates = []
+        for number in range(3):
+            course = create_course(f'Course {number}')
+            enrollment = Enrollment.objects.create(user=learner, course=course, status='completed')
+            cls.certificates.append(str(Certificate.objects.get(enrollment=enrollment).certificate_id))
+
+    def setUp(self):
+        cache.clear()
+
+    def verify_bulk(self, ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('api_certificate_verify_bulk'), json.dumps({'ids': ids}),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()['results']
+
+    def test_bulk_verification_is_one_query_then_cached(self):
+        ids = self.certificates + ['unknown']
+        queries, results = self.verify_bulk(ids)
+
+        # The generation lookup, then one IN query for every id
+        self.assertEqual(queries, 2)
+        self.assertEqual([result['valid'] for result in results], [True, True, True, False])
+        self.assertEqual(results[0]['holder'], 'Ada')
+        self.assertEqual(self.verify_bulk(ids)[0], 1)
+
+    def test_single_verification_caches_negative_answers(self):
+        url = reverse('api_certificate_verify', args=['unknown'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_deleted_certificate_stops_verifying(self):
+        url = reverse('api_certificate_verify', args=[self.certificates[0]])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # The cached answer stays put; the bumped generation just stops it being read
+        Certificate.objects.get(certificate_id=self.certificates[0]).delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_bulk_verification_rejects_too_many_ids(self):
+        response = self.client.post(reverse('api_certificate_verify_bulk'), json.dumps({'ids': ['x'] * 1001}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class QuizGradingQueryBudgetTests(TestCase):
+    """Submitting an attempt grades every answer in one pass with a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user('quizzer', 'quizzer@example.com', 'pass12345')
+        course = create_course()
+        module = Module.objects.create(course=course, title='Module', order=0)
+        cls.enrollment = Enrollment.objects.create(user=cls.learner, course=course)
+        cls.quiz = Quiz.objects.create(module=module, title='Quiz', passing_score=50)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.learner)
+
+    def add_questions(self, count):
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(quiz=self.quiz, question_text=f'Question {number}', options=['A', 'B', 'C'],
+                         correct_answer='B', order=number)
+            for number in range(count)
+        ])
+        Quiz.objects.filter(pk=self.quiz.pk).update(version=F('version') + 1)
+
+    def submit(self, right, wrong):
+        self.client.post(reverse('quiz', args=[self.enrollment.pk, self.quiz.pk]))
+        attempt = QuizAttempt.objects.get(status='in_progress')
+        question_ids = list(self.quiz.questions.values_list('id', flat=True))
+        data = {f'question_{question_id}': '1' for question_id in question_ids[:right]}
+        data.update({f'question_{question_id}': '0' for question_id in question_ids[right:right + wrong]})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('quiz_submit', args=[attempt.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        attempt.refresh_from_db()
+        return len(queries), attempt
+
+    def test_grading_query_count_does_not_grow_with_questions(self):
+        self.add_questions(5)
+        short_quiz, attempt = self.submit(right=3, wrong=2)
+        self.assertEqual((attempt.score, attempt.max_score, attempt.passed), (3, 5, True))
+
+        self.add_questions(45)
+        long_quiz, attempt = self.submit(right=10, wrong=30)
+        self.assertEqual((attempt.score, attempt.max_score, attempt.passed), (10, 50, False))
+        self.assertEqual(attempt.answers.count(), 40)
+        self.assertEqual(short_quiz, long_quiz)
+
+    def test_starting_twice_keeps_one_open_attempt(self):
+        self.add_questions(2)
+        for _ in range(2):
+            self.client.post(reverse('quiz', args=[self.enrollment.pk, self.quiz.pk]))
+        self.assertEqual(QuizAttempt.objects.filter(status='in_progress').count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            QuizAttempt.objects.create(quiz=self.quiz, enrollment=self.enrollment)
+
+    def test_late_submission_is_not_scored(self):
+        self.add_questions(2)
+        self.client.post(reverse('quiz', args=[self.enrollment.pk, self.quiz.pk]))
+        QuizAttempt.objects.update(deadline=timezone.now() - timedelta(minutes=5))
+        attempt = QuizAttempt.objects.get()
+        question_id = self.quiz.questions.values_list('id', flat=True)[0]
+        self.client.post(reverse('quiz_submit', args=[attempt.pk]), {f'question_{question_id}': '1'})
+
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.score), ('expired', 0))
+        self.assertFalse(attempt.answers.exists())
+
+
+class QuizItemAnalysisTests(TestCase):
+    """Item analysis adds new attempts to running totals instead of re-reading every answer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        learner = User.objects.create_user('analyzed', 'analyzed@example.com', 'pass12345')
+        course = create_course()
+        module = Module.objects.create(course=course, title='Module', order=0)
+        cls.enrollment = Enrollment.objects.create(user=learner, course=course)
+        cls.quiz = Quiz.objects.create(module=module, title='Quiz')
+        cls.first = QuizQuestion.objects.create(
+            quiz=cls.quiz, question_text='First', options=['A', 'B'], correct_answer='B', order=0,
+        )
+        cls.second = QuizQuestion.objects.create(
+            quiz=cls.quiz, question_text='Second', question_type='true_false', correct_answer='true', order=1,
+        )
+        cls.quiz.refresh_from_db()
+
+    def add_attempts(self, *responses):
+        """One submitted attempt per {question: response}, graded against the questions above"""
+        expected = {self.first: '1', self.second: 'true'}
+        for answered in responses:
+            attempt = QuizAttempt.objects.create(
+                quiz=self.quiz, enrollment=self.enrollment, status='submitted',
+                submitted_at=timezone.now() - timedelta(minutes=5), quiz_version=self.quiz.version,
+            )
+            QuizAnswer.objects.bulk_create([
+                QuizAnswer(
+                    attempt=attempt, question=question, response=response, is_correct=response == expected[question],
+                    points_awarded=int(response == expected[question]),
+                )
+                for question, response in answered.items()
+            ])
+
+    def test_stats_match_hand_computed_values(self):
+        self.add_attempts(
+            {self.first: '1', self.second: 'true'},
+            {self.first: '1', self.second: 'false'},
+            {self.first: '0', self.second: 'true'},
+            {self.first: '0'},
+        )
+        self.assertEqual(refresh_quiz_stats(self.quiz), 4)
+
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        first = stats.items.get(question=self.first)
+        self.assertEqual((stats.attempt_count, first.p_value), (4, 0.5))
+        self.assertAlmostEqual(first.point_biserial, 0.5 ** 0.5)
+        self.assertAlmostEqual(stats.cronbach_alpha, 0.0)
+        self.assertEqual(first.response_counts, {'0': 2, '1': 2})
+        self.assertEqual(stats.items.get(question=self.second).response_counts, {'true': 2, 'false': 1})
+
+    def test_incremental_refresh_matches_rebuild(self):
+        self.add_attempts({self.first: '1', self.second: 'true'}, {self.first: '0', self.second: 'true'})
+        refresh_quiz_stats(self.quiz)
+        self.add_attempts({self.first: '1', self.second: 'false'}, {self.second: 'false'}, {self.first: '1'})
+        self.assertEqual(refresh_quiz_stats(self.quiz), 3)
+        self.assertEqual(refresh_quiz_stats(self.quiz), 0)
+        fields = ['question_id', 'attempt_count', 'correct_count', 'correct_total_sum', 'response_counts',
+                  'p_value', 'point_biserial']
+        incremental = list(QuizStats.objects.get(quiz=self.quiz).items.order_by('question_id').values(*fields))
+
+        self.assertEqual(refresh_quiz_stats(self.quiz, rebuild=True), 5)
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        self.assertEqual(list(stats.items.order_by('question_id').values(*fields)), incremental)
+        self.assertEqual(stats.attempt_count, 5)
+
+
+class QuizQuestionPoolTests(TestCase):
+    """Attempts draw from a cached question bank, so showing a quiz doesn't query its questions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user('pooled', 'pooled@example.com', 'pass12345')
+        course = create_course()
+        module = Module.objects.create(course=course, title='Module', order=0)
+        cls.enrollment = Enrollment.objects.create(user=cls.learner, course=course)
+        cls.quiz = Quiz.objects.create(module=module, title='Quiz', draw_count=4, shuffle_options=True)
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(quiz=cls.quiz, question_text=f'Question {number}', options=['A', 'B', 'C', 'D'],
+                         correct_answer='D', order=number)
+            for number in range(10)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.learner)
+
+    def start(self):
+        self.client.post(reverse('quiz', args=[self.enrollment.pk, self.quiz.pk]))
+        return QuizAttempt.objects.select_related('quiz').get(status='in_progress')
+
+    def test_draw_is_seeded_by_attempt_and_served_from_cache(self):
+        attempt = self.start()
+        self.assertEqual(len(attempt.question_ids), 4)
+        self.client.get(reverse('quiz_attempt', args=[attempt.pk]))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quiz_attempt', args=[attempt.pk]))
+        self.assertContains(response, 'Question ', count=4)
+        self.assertFalse([query for query in queries if 'quizquestion' in query['sql'].lower()])
+
+        drawn = attempt_questions(QuizAttempt.objects.select_related('quiz').get(pk=attempt.pk))
+        self.assertEqual([question.id for question, _ in drawn], attempt.question_ids)
+        self.assertEqual(drawn, attempt_questions(attempt))
+        self.assertTrue(all(sorted(options) == list(enumerate('ABCD')) for _, options in drawn))
+
+    def test_only_drawn_questions_are_graded(self):
+        attempt = self.start()
+        data = {f'question_{question_id}': '3' for question_id in attempt.question_ids}
+        self.client.post(reverse('quiz_submit', args=[attempt.pk]), data)
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.score, attempt.max_score, attempt.passed), (4, 4, True))
+
+        QuizAttempt.objects.update(submitted_at=timezone.now() - timedelta(minutes=5))
+        refresh_quiz_stats(self.quiz)
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        counts = dict(stats.items.values_list('question_id', 'attempt_count'))
+        self.assertEqual({question_id for question_id, count in counts.items() if count}, set(attempt.question_ids))
+        self.assertIsNone(stats.cronbach_alpha)
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+    """Finished jobs drop their payloads (codes, reset links) and are purged after the retention period"""
+
+    def run_queued(self):
+        return [run_job(job, 'tests') for job in claim_jobs('tests', 10, 60)]
+
+    def test_finished_jobs_forget_their_payload(self):
+        enqueue('send_email', {'subject': 'Code', 'body': 'Your verification code is: 123456', 'to': ['a@b.c']})
+        self.assertEqual(self.run_queued(), ['succeeded'])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(Job.objects.get().payload, {})
+
+    def test_failed_retries_keep_their_payload_until_the_last_attempt(self):
+        enqueue('send_email', {'subject': 'Code', 'body': 'Body', 'to': ['a@b.c'], 'bogus': 1}, max_attempts=2)
+        with self.assertLogs('App2.jobs', 'WARNING'):
+            self.assertEqual(self.run_queued(), ['queued'])
+        self.assertIn('bogus', Job.objects.get().payload)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('App2.jobs', 'ERROR'):
+            self.assertEqual(self.run_queued(), ['failed'])
+        self.assertEqual(Job.objects.get().payload, {})
+
+    def test_purge_keeps_recent_and_unfinished_jobs(self):
+        now = timezone.now()
+        Job.objects.bulk_create([
+            Job(task='send_email', status='succeeded', finished_at=now - timedelta(days=8)),
+            Job(task='send_email', status='failed', finished_at=now - timedelta(days=8)),
+            Job(task='send_email', status='succeeded', finished_at=now - timedelta(days=1)),
+            Job(task='send_email', status='queued'),
+        ])
+        self.assertEqual(purge_finished_jobs(timedelta(days=7)), 2)
+        self.assertEqual(Job.objects.count(), 2)
+
+
+class CompletionBitmapTests(TestCase):
+    """The completion bitmap is written by complete_lesson() only and rebuilt when the outline changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user('bitmapped', 'bitmapped@example.com', 'pass12345')
+        cls.course = create_course()
+        module = Module.objects.create(course=cls.course, title='Module', order=0)
+        cls.lessons = [
+            Lesson.objects.create(module=module, title=f'Lesson {order}', order=order) for order in range(10)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.enrollment = Enrollment.objects.create(user=self.learner, course=self.course)
+
+    def complete(self, lesson):
+        progress, _ = Progress.objects.get_or_create(enrollment=self.enrollment, lesson=lesson)
+        self.enrollment.complete_lesson(progress)
+
+    def index(self):
+        self.course.refresh_from_db()
+        return get_lesson_index(self.course)
+
+    def test_bitmap_operations(self):
+        bitmap = CompletionBitmap()
+        for position in (0, 3, 9, 17):
+            bitmap.add(position)
+        bitmap.add(3)
+        self.assertEqual(list(bitmap.positions()), [0, 3, 9, 17])
+        self.assertEqual((bitmap.count(), 9 in bitmap, 8 in bitmap, 200 in bitmap), (4, True, False, False))
+        self.assertEqual(CompletionBitmap(bitmap.to_bytes()).to_bytes(), bitmap.to_bytes())
+        # Trailing empty bytes aren't stored
+        self.assertEqual(CompletionBitmap(b'\x01\x00\x00').to_bytes(), b'\x01')
+
+        index = self.index()
+        lesson_ids = [self.lessons[2].id, self.lessons[7].id, 10 ** 9]
+        self.assertEqual(list(CompletionBitmap.from_lesson_ids(lesson_ids, index).positions()), [2, 7])
+
+    def test_completions_set_bits_and_progress(self):
+        for lesson in self.lessons[:3]:
+            self.complete(lesson)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completion_bitmap_signature, self.index().signature)
+        self.assertEqual(list(CompletionBitmap(self.enrollment.completion_bitmap).positions()), [0, 1, 2])
+        self.assertEqual(self.enrollment.progress_percentage, 30)
+
+    def test_stale_instance_does_not_save_its_bitmap_back(self):
+        stale = Enrollment.objects.get(pk=self.enrollment.pk)
+        self.complete(self.lessons[0])
+        stale.payment_status = False
+        stale.save()
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual(list(CompletionBitmap(self.enrollment.completion_bitmap).positions()), [0])
+        self.assertFalse(self.enrollment.payment_status)
+
+    def test_signature_mismatch_rebuilds_from_progress_rows(self):
+        self.complete(self.lessons[0])
+        # Progress written behind the bitmap's back, with the bitmap left stale
+        Progress.objects.bulk_create([
+            Progress(enrollment=self.enrollment, lesson=lesson, is_completed=True) for lesson in self.lessons[1:4]
+        ])
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(completion_bitmap_signature=1)
+
+        self.enrollment.refresh_from_db()
+        self.complete(self.lessons[5])
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completion_bitmap_signature, self.index().signature)
+        self.assertEqual(list(CompletionBitmap(self.enrollment.completion_bitmap).positions()), [0, 1, 2, 3, 5])
+        self.assertEqual(self.enrollment.progress_percentage, 50)
+
+    def test_cancelled_enrollment_stays_cancelled_at_full_progress(self):
+        self.enrollment.status = 'cancelled'
+        self.enrollment.save()
+        for lesson in self.lessons:
+            self.complete(lesson)
+        self.assertEqual(self.enrollment.status, 'cancelled')
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.status, self.enrollment.progress_percentage), ('cancelled', 100))
+        self.assertIsNone(self.enrollment.completion_date)
+        self.assertFalse(Certificate.objects.filter(enrollment=self.enrollment).exists())
+
+
+
+class OutlineCacheTests(TestCase):
+    """Editing a module or lesson bumps outline_version, so the cached outline is rebuilt"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = create_course()
+        cls.module = Module.objects.create(course=cls.course, title='Module', order=0)
+        cls.lessons = [
+            Lesson.objects.create(module=cls.module, title=f'Lesson {order}', order=order) for order in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def outline(self):
+        self.course.refresh_from_db()
+        return get_course_outline(self.course)
+
+    def titles(self):
+        return [
+            (module['title'], [lesson['title'] for lesson in module['lessons']]) for module in self.outline()['modules']
+        ]
+
+    def test_outline_is_cached_per_version(self):
+        self.outline()
+        with self.assertNumQueries(0):
+            get_outline(self.course.pk, self.course.outline_version)
+
+    def assertChangeShows(self, change, titles):
+        self.titles()
+        version = self.course.outline_version
+        change()
+        self.assertEqual(self.titles(), titles)
+        self.assertGreater(self.course.outline_version, version)
+
+    def test_lesson_retitled_or_deactivated(self):
+        lesson = self.lessons[0]
+
+        def retitle():
+            lesson.title = 'Renamed'
+            lesson.save()
+        self.assertChangeShows(retitle, [('Module', ['Renamed', 'Lesson 1'])])
+
+        def deactivate():
+            lesson.is_active = False
+            lesson.save()
+        self.assertChangeShows(deactivate, [('Module', ['Lesson 1'])])
+
+    def test_module_retitled_or_deactivated(self):
+        def retitle():
+            self.module.title = 'Renamed'
+            self.module.save()
+        self.assertChangeShows(retitle, [('Renamed', ['Lesson 0', 'Lesson 1'])])
+
+        def deactivate():
+            self.module.is_active = False
+            self.module.save()
+        self.assertChangeShows(deactivate, [])
+
+class ItemSumsTests(SimpleTestCase):
+    """The NumPy item sums count every kind of attempt in a batch"""
+
+    QUESTIONS = [11, 12, 13, 14]
+    FIELDS = (
+        'attempt_count', 'total_sum', 'total_sq_sum', 'correct_count', 'score_sum', 'score_sq_sum',
+        'correct_total_sum',
+    )
+
+    def test_full_drawn_and_partial_attempts(self):
+        attempts = [
+            (7, []),  # asked every question
+            (3, [12, 14]),  # drew two
+            (5, [13, 99, 11]),  # drew a question deleted since
+            (9, []),  # answered nothing
+            (4, [14]),
+        ]
+        rows = [
+            (7, 11, True, 2), (7, 12, False, 0), (7, 14, True, 1),
+            (3, 12, True, 3), (3, 14, False, 0),
+            (5, 13, True, 1), (5, 11, False, 0),
+            (4, 14, True, 1),
+        ]
+        quiz_sums, sums = answer_sums(attempts, self.QUESTIONS, rows)
+        # Attempt totals: 7 -> 3, 3 -> 3, 5 -> 1, 9 -> 0, 4 -> 1
+        self.assertEqual(quiz_sums, {'attempt_count': 5, 'total_sum': 8, 'total_sq_sum': 9 + 9 + 1 + 1})
+        self.assertEqual(sums, {
+            11: dict(zip(self.FIELDS, (3, 4, 10, 1, 2, 4, 3))),
+            12: dict(zip(self.FIELDS, (3, 6, 18, 1, 3, 9, 3))),
+            13: dict(zip(self.FIELDS, (3, 4, 10, 1, 1, 1, 1))),
+            14: dict(zip(self.FIELDS, (4, 7, 19, 2, 2, 2, 4))),
+        })
+
+    def test_batches_without_answers(self):
+        quiz_sums, sums = answer_sums([(1, []), (2, [11])], self.QUESTIONS, [])
+        self.assertEqual(quiz_sums, {'attempt_count': 2, 'total_sum': 0, 'total_sq_sum': 0})
+        self.assertEqual([sums[question]['attempt_count'] for question in self.QUESTIONS], [2, 1, 1, 1])
+        quiz_sums, sums = answer_sums([], self.QUESTIONS, [])
+        self.assertEqual(quiz_sums, {'attempt_count': 0, 'total_sum': 0, 'total_sq_sum': 0})
+        self.assertEqual(sums[11]['attempt_count'], 0)
+
+class ChunkedUploadTests(TestCase):
+    """Chunks must arrive at the session's offset with a matching checksum; completing claims the session once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('uploader', 'uploader@example.com', 'pass12345')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        overrides = override_settings(
+            CHUNKED_UPLOAD_DIR=os.path.join(self.directory, 'parts'), MEDIA_ROOT=self.directory,
+            CHUNKED_UPLOAD_CHUNK_SIZE=4,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client.force_login(self.admin)
+        self.data = b'0123456789'
+        response = self.client.post(
+            reverse('upload_start'), {'filename': 'notes.txt', 'size': len(self.data), 'target': 'lesson'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.url = reverse('upload_session', args=[response.json()['id']])
+        self.complete_url = reverse('upload_complete', args=[response.json()['id']])
+
+    def send(self, offset, chunk, checksum=None):
+        checksum = checksum or hashlib.sha256(chunk).hexdigest()
+        return self.client.patch(
+            self.url, chunk, content_type='application/offset+octet-stream',
+            headers={'Upload-Offset': str(offset), 'Upload-Checksum': f'sha256 {checksum}'},
+        )
+
+    def complete(self, sha256=''):
+        return self.client.post(self.complete_url, {'sha256': sha256}, content_type='application/json')
+
+    def test_offset_mismatch(self):
+        self.assertEqual(self.send(0, b'0123').status_code, 200)
+        response = self.send(0, b'0123')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4)
+
+    def test_checksum_mismatch_keeps_the_offset(self):
+        self.assertEqual(self.send(0, b'0123').status_code, 200)
+        response = self.send(4, b'4567', checksum=hashlib.sha256(b'nope').hexdigest())
+        self.assertEqual(response.status_code, 400)
+        session = UploadSession.objects.get()
+        self.assertEqual(session.offset, 4)
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, 'parts', f'{session.pk}.part')), 4)
+
+    def test_resume_from_the_reported_offset(self):
+        self.send(0, b'0123')
+        self.send(4, b'4567')
+        offset = self.client.get(self.url).json()['offset']
+        self.assertEqual(offset, 8)
+        self.assertEqual(self.send(offset, self.data[offset:]).status_code, 200)
+
+        response = self.complete(hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(response.status_code, 200)
+        session = UploadSession.objects.get()
+        self.assertEqual((session.status, session.sha256), ('complete', hashlib.sha256(self.data).hexdigest()))
+        with open(os.path.join(self.directory, session.stored_name), 'rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        # Completing again just reports the result
+        self.assertEqual(self.complete().json()['status'], 'complete')
+
+    def test_whole_file_checksum_mismatch_leaves_the_session_retryable(self):
+        for offset in range(0, len(self.data), 4):
+            self.send(offset, self.data[offset:offset + 4])
+        self.assertEqual(self.complete(hashlib.sha256(b'nope').hexdigest()).status_code, 400)
+        self.assertEqual(UploadSession.objects.get().status, 'uploading')
+        self.assertEqual(self.complete().status_code, 200)
+
+    def test_completion_already_claimed(self):
+        for offset in range(0, len(self.data), 4):
+            self.send(offset, self.data[offset:offset + 4])
+        UploadSession.objects.update(status='completing')
+        response = self.complete()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(UploadSession.objects.get().status, 'completing')
+        self.assertEqual(self.send(len(self.data), b'x').status_code, 409)
+
+    def test_incomplete_upload_or_bad_body_is_refused(self):
+        self.send(0, b'0123')
+        self.assertEqual(self.complete().status_code, 409)
+        response = self.client.post(self.complete_url, b'[1]', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().status, 'uploading')
+
+
+class ProtectedDownloadTests(TestCase):
+    """Lesson files stream with single-range support and only to staff and enrolled learners"""
+
+    DATA = bytes(range(100))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.learner = User.objects.create_user('downloader', 'downloader@example.com', 'pass12345')
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pass12345')
+        cls.course = create_course()
+        cls.module = Module.objects.create(course=cls.course, title='Module', order=0)
+        Enrollment.objects.create(user=cls.learner, course=cls.course)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        overrides = override_settings(MEDIA_ROOT=directory, PROTECTED_MEDIA_SERVER='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.lesson = Lesson.objects.create(module=self.module, title='Lesson', order=0)
+        self.lesson.content_file.save('notes.bin', ContentFile(self.DATA))
+        self.url = reverse('lesson_file', args=[self.lesson.pk])
+        self.client.force_login(self.learner)
+
+    def fetch(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        return response, b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=95-', 100), (95, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        self.assertIs(parse_range('bytes=-0', 100), False)
+        self.assertIs(parse_range('bytes=100-', 100), False)
+        self.assertIs(parse_range('bytes=20-10', 100), False)
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertIsNone(parse_range('items=0-1', 100))
+
+    def test_whole_file(self):
+        response, body = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.DATA)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_single_range(self):
+        response, body = self.fetch(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.DATA[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_suffix_and_open_ended_ranges(self):
+        response, body = self.fetch(Range='bytes=-5')
+        self.assertEqual((response.status_code, body), (206, self.DATA[-5:]))
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+        response, body = self.fetch(Range='bytes=60-')
+        self.assertEqual((response.status_code, body), (206, self.DATA[60:]))
+        self.assertEqual(response['Content-Range'], 'bytes 60-99/100')
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.fetch(Range='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_multiple_ranges_get_the_whole_file(self):
+        response, body = self.fetch(Range='bytes=0-1,5-6')
+        self.assertEqual((response.status_code, body), (200, self.DATA))
+
+    def test_if_range(self):
+        etag = self.fetch()[0]['ETag']
+        response, body = self.fetch(Range='bytes=0-9', **{'If-Range': etag})
+        self.assertEqual((response.status_code, body), (206, self.DATA[:10]))
+        response, body = self.fetch(Range='bytes=0-9', **{'If-Range': '"stale"'})
+        self.assertEqual((response.status_code, body), (200, self.DATA))
+
+    def test_conditional_request(self):
+        etag = self.fetch()[0]['ETag']
+        self.assertEqual(self.fetch(**{'If-None-Match': etag})[0].status_code, 304)
+
+    def test_access(self):
+        self.assertFalse(can_access(self.outsider, self.course.pk))
+        self.assertTrue(can_access(self.learner, self.course.pk))
+        self.assertTrue(can_access(self.outsider, self.course.pk, preview=True))
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        Lesson.objects.filter(pk=self.lesson.pk).update(is_preview=True)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class KeysetPaginatorTests(TestCase):
+    """Cursors round-trip the sort key, survive ties and rows added meanwhile, and bad ones fall back to page one"""
+
+    ORDERING = ['-date_joined', '-id']
+
+    @classmethod
+    def setUpTestData(cls):
+        joined = timezone.now().replace(microsecond=123456)
+        # Four users share a date_joined, so ties straddle the page boundary
+        for number, days in enumerate([0, 1, 1, 1, 1, 2, 3]):
+            User.objects.create_user(f'paged{number}', date_joined=joined - timedelta(days=days))
+        cls.expected = list(User.objects.order_by(*cls.ORDERING).values_list('pk', flat=True))
+
+    def paginator(self, **kwargs):
+        return KeysetPaginator(User.objects.all(), self.ORDERING, per_page=3, **kwargs)
+
+    def walk(self, cursor=None, direction='next'):
+        pages = []
+        while True:
+            page = self.paginator().page(cursor)
+            pages.append([user.pk for user in page])
+            cursor = page.next_cursor if direction == 'next' else page.previous_cursor
+            if cursor is None:
+                return pages, page
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator()
+        user = User.objects.get(username='paged2')
+        self.assertEqual(
+            paginator.decode_cursor(paginator.encode_cursor(user, backwards=True)), (True, [user.date_joined, user.pk]),
+        )
+        row = User.objects.values('date_joined', 'id').get(pk=user.pk)
+        self.assertEqual(paginator.encode_cursor(row, backwards=False), paginator.encode_cursor(user, backwards=False))
+
+    def test_invalid_cursors(self):
+        paginator = self.paginator()
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        joined = '2026-01-01T00:00:00+00:00'
+        cursors = [
+            'not a cursor', encode({'direction': 0}), encode([0, [joined]]), encode([0, ['yesterday', 1]]),
+            encode([0, [joined, 'one']]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.decode_cursor(cursor)
+                self.assertEqual([user.pk for user in paginator.page(cursor)], self.expected[:3])
+
+    def test_walks_every_row_once_through_ties(self):
+        pages, last = self.walk()
+        self.assertEqual(pages, [self.expected[:3], self.expected[3:6], self.expected[6:]])
+        self.assertFalse(last.has_next())
+        self.assertTrue(last.has_previous())
+
+        backwards, first = self.walk(last.previous_cursor, direction='previous')
+        self.assertEqual(backwards, [self.expected[3:6], self.expected[:3]])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+    def test_rows_added_between_pages_do_not_shift_the_next_page(self):
+        first = self.paginator().page()
+        User.objects.create_user('newcomer')
+        second = self.paginator().page(first.next_cursor)
+        self.assertEqual([user.pk for user in second], self.expected[3:6])
+
+    def test_total_estimate(self):
+        page = self.paginator(count_limit=5).page()
+        self.assertEqual((page.total, page.total_exact), (5, False))
+        page = self.paginator(count_limit=10).page()
+        self.assertEqual((page.total, page.total_exact), (7, True))
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods, require_POST
+
+from .models import Lesson, Task, UploadSession
+
+
+# Resumable chunked uploads
+# A client opens a session with the file's name and size, then PATCHes the
+# bytes in order, each chunk carrying its Upload-Offset and an
+# Upload-Checksum (sha256 of the chunk). Chunks are appended to a temp file
+# under settings.CHUNKED_UPLOAD_DIR, reading the request body in small blocks,
+# so memory use doesn't depend on the file size. After an interruption the
+# client asks for the session's offset and carries on from there. Completing
+# the session claims it (a concurrent completion gets a 409), hashes the
+# whole file and moves it into the target field's storage in one step (a
+# rename on local storage); the form then attaches the stored name to the new
+# lesson or task.
+TARGETS = {'lesson': Lesson, 'task': Task}
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def target_field(target):
+    return TARGETS[target]._meta.get_field('content_file')
+
+
+def part_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.pk}.part')
+
+
+def session_state(session):
+    return {'id': str(session.pk), 'offset': session.offset, 'size': session.size, 'status': session.status,
+            'sha256': session.sha256 or None, 'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE}
+
+
+def error(message, status=400, session=None):
+    """JSON error; with the session's state, so the client knows where to resume"""
+    state = session_state(session) if session else {}
+    return JsonResponse({**state, 'error': message}, status=status)
+
+
+def superuser_required(view):
+    def wrapped(request, *args, **kwargs):
+        if not request.user.is_superuser:
+            return error('Admin privileges required', status=403)
+        return view(request, *args, **kwargs)
+    return wrapped
+
+
+def parse_checksum(header):
+    """Hex digest from an ``Upload-Checksum: sha256 <hex>`` header, or None"""
+    algorithm, _, digest = (header or '').partition(' ')
+    if algorithm.lower() != 'sha256' or len(digest.strip()) != 64:
+        return None
+    return digest.strip().lower()
+
+
+class TemporaryPart(File):
+    """The assembled temp file; FileSystemStorage moves it instead of copying"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+@require_POST
+@superuser_required
+def start_upload(request):
+    try:
+        data = json.loads(request.body)
+        filename = os.path.basename(str(data['filename'])).strip()
+        size = int(data['size'])
+        target = data['target']
+    except (ValueError, KeyError, TypeError):
+        return error('Expected JSON with filename, size and target')
+    if target not in TARGETS or not filename or size < 0:
+        return error('Invalid filename, size or target')
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return error('File too large', status=413)
+
+    session = UploadSession.objects.create(user=request.user, target=target, filename=filename, size=size)
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return JsonResponse(session_state(session), status=201)
+
+
+@require_http_methods(['GET', 'PATCH', 'DELETE'])
+@superuser_required
+def upload_session(request, upload_id):
+    """GET reports the offset to resume from, PATCH appends a chunk, DELETE abandons the upload"""
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(session_state(session))
+    if request.method == 'DELETE':
+        discard(session)
+        return HttpResponse(status=204)
+    return append_chunk(request, session)
+
+
+def append_chunk(request, session):
+    if session.status != 'uploading':
+        return error('Upload already completed', status=409, session=session)
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return error('Upload-Offset and Content-Length are required')
+    checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+    if checksum is None:
+        return error('Upload-Checksum must be "sha256 <hex digest>"')
+    if offset != session.offset:
+        # The client lost track (e.g. a chunk was stored but its response lost)
+        return error('Offset mismatch', status=409, session=session)
+    if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE or offset + length > session.size:
+        return error('Chunk too large', status=413, session=session)
+
+    digest = hashlib.sha256()
+    with open(part_path(session), 'r+b') as part:
+        # Drops anything a failed earlier attempt left past the offset
+        part.truncate(offset)
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            block = request.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            part.write(block)
+            remaining -= len(block)
+        if remaining or digest.hexdigest() != checksum:
+            part.truncate(offset)
+            return error('Chunk incomplete or checksum mismatch', session=session)
+        part.flush()
+        os.fsync(part.fileno())
+
+    # Conditional on the offset, so a concurrent duplicate of this chunk can't count twice
+    if not UploadSession.objects.filter(pk=session.pk, offset=offset, status='uploading').update(
+        offset=offset + length, updated_at=timezone.now(),
+    ):
+        session.refresh_from_db()
+        return error('Offset mismatch', status=409, session=session)
+    session.offset = offset + length
+    return JsonResponse(session_state(session))
+
+
+@require_POST
+@superuser_required
+def complete_upload(request, upload_id):
+    """Verify the assembled file and move it into storage; returns its sha256"""
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        expected = str(json.loads(request.body or b'{}').get('sha256') or '').strip().lower()
+    except (ValueError, AttributeError):
+        return error('Expected a JSON object')
+    if session.status == 'complete':
+        return JsonResponse(session_state(session))
+    if session.offset != session.size:
+        return error('Upload incomplete', status=409, session=session)
+    # Claim the session first, so a concurrent completion can't move the part file from under us
+    if not UploadSession.objects.filter(pk=session.pk, status='uploading', offset=session.size).update(
+        status='completing', updated_at=timezone.now(),
+    ):
+        session.refresh_from_db()
+        if session.status == 'complete':
+            return JsonResponse(session_state(session))
+        return error('Upload is already being completed', status=409, session=session)
+
+    try:
+        path = part_path(session)
+        digest = hashlib.sha256()
+        with open(path, 'rb') as part:
+            for block in iter(lambda: part.read(READ_BLOCK_SIZE), b''):
+                digest.update(block)
+        if expected and expected != digest.hexdigest():
+            UploadSession.objects.filter(pk=session.pk).update(status='uploading')
+            session.status = 'uploading'
+            return error('Checksum mismatch', session=session)
+
+        field = target_field(session.target)
+        with open(path, 'rb') as part:
+            stored_name = field.storage.save(field.generate_filename(None, session.filename), TemporaryPart(part))
+    except Exception:
+        # Leave the session retryable
+        UploadSession.objects.filter(pk=session.pk, status='completing').update(status='uploading')
+        raise
+    if os.path.exists(path):
+        # Storages that copy rather than move leave the part behind
+        os.remove(path)
+    UploadSession.objects.filter(pk=session.pk).update(
+        status='complete', sha256=digest.hexdigest(), stored_name=stored_name, updated_at=timezone.now(),
+    )
+    session.refresh_from_db()
+    return JsonResponse(session_state(session))
+
+
+def discard(session):
+    """Delete a session and whatever it wrote that no form has claimed"""
+    path = part_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    if session.stored_name:
+        target_field(session.target).storage.delete(session.stored_name)
+    session.delete()
+
+
+def claim_upload(upload_id, user, target):
+    """Stored file name of a completed upload, consuming its session; None if there is none"""
+    session = UploadSession.objects.filter(pk=upload_id, user=user, target=target, status='complete').first()
+    if session is None:
+        return None
+    session.delete()
+    return session.stored_name
+
+
+def purge_stale_uploads(max_age):
+    """Discard sessions untouched for ``max_age``; returns how many"""
+    stale = list(UploadSession.objects.filter(updated_at__lt=timezone.now() - max_age))
+    for session in stale:
+        discard(session)
+    return len(stale)
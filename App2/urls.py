@@ -1,6 +1,7 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.contrib.auth import views as auth_views
 from .views import *
+from . import api, downloads, uploads
 
 urlpatterns = [
     # Authentication URLs
@@ -27,6 +28,17 @@ urlpatterns = [
     path('dashboard/profile/', profile_view, name='profile'),
     path('dashboard/enrollment/<int:enrollment_id>/', course_progress_view, name='course_progress'),
     path('dashboard/enrollment/<int:enrollment_id>/lesson/<int:lesson_id>/', lesson_view, name='lesson_view'),
+    path('dashboard/enrollment/<int:enrollment_id>/certificate/', certificate_view, name='certificate'),
+    path('dashboard/enrollment/<int:enrollment_id>/quiz/<int:quiz_id>/', quiz_view, name='quiz'),
+    path('dashboard/quiz-attempts/<int:attempt_id>/', quiz_attempt_view, name='quiz_attempt'),
+    path('dashboard/quiz-attempts/<int:attempt_id>/submit/', quiz_submit, name='quiz_submit'),
+
+    # Protected content files
+    path('content/lessons/<int:lesson_id>/file/', downloads.lesson_file, name='lesson_file'),
+    path('content/tasks/<int:task_id>/file/', downloads.task_file, name='task_file'),
+    path('certificates/verify/<str:certificate_id>/', certificate_verify_view, name='certificate_verify'),
+    re_path(r'^certificates/(?P<certificate_id>[\w-]+)\.(?P<extension>pdf|png)$', downloads.certificate_file,
+            name='certificate_file'),
 
     # Admin URLs - Enhanced Course Management (Custom Admin Dashboard)
     path('admin_dashboard/', admin_course_management, name='admin_course_management'),
@@ -43,6 +55,10 @@ urlpatterns = [
     path('admin_dashboard/modules/<int:module_id>/tasks/create/', admin_task_create, name='admin_task_create'),
     path('admin_dashboard/modules/<int:module_id>/quiz/create/', admin_quiz_create, name='admin_quiz_create'),
     path('admin_dashboard/quizzes/<int:quiz_id>/questions/', admin_quiz_questions, name='admin_quiz_questions'),
+    path('admin_dashboard/quizzes/<int:quiz_id>/stats/', admin_quiz_stats, name='admin_quiz_stats'),
+    path('admin_dashboard/uploads/', uploads.start_upload, name='upload_start'),
+    path('admin_dashboard/uploads/<uuid:upload_id>/', uploads.upload_session, name='upload_session'),
+    path('admin_dashboard/uploads/<uuid:upload_id>/complete/', uploads.complete_upload, name='upload_complete'),
 
     # Legacy Admin URLs (keeping for compatibility)
     path('admin/courses/', AdminCourseListView.as_view(), name='admin_course_list'),
@@ -52,6 +68,12 @@ urlpatterns = [
 
     # API URLs
     path('api/mark-lesson-complete/<int:enrollment_id>/<int:lesson_id>/', mark_lesson_complete, name='mark_lesson_complete'),
+    path('api/courses/', api.course_list, name='api_course_list'),
+    path('api/courses/export/', api.course_export, name='api_course_export'),
+    path('api/courses/<int:pk>/', api.course_detail, name='api_course_detail'),
+    path('api/enrollments/', api.my_enrollments, name='api_enrollments'),
+    path('api/certificates/verify/', api.certificate_verify_bulk, name='api_certificate_verify_bulk'),
+    path('api/certificates/verify/<str:certificate_id>/', api.certificate_verify, name='api_certificate_verify'),
 
     # Legacy URLs (for backward compatibility)
     path('register/', register_view, name='legacy_register'),
@@ -0,0 +1,79 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Certificate
+from .pagecache import get_generation
+
+
+# Public certificate verification
+# Lookups go through the unique index on certificate_id with the holder and
+# course joined in, and every answer (including "no such certificate") is
+# cached, since the same ids are checked over and over. Keys carry the
+# 'certificate' generation stored in the database, which every certificate
+# save or delete bumps, so a revoked or newly issued certificate is seen by
+# every worker at once, even with a per-process cache.
+VERIFY_KEY = 'certificate:verify:{generation}:{digest}'
+BULK_VERIFY_LIMIT = 1000
+
+
+def verify_key(certificate_id, generation):
+    # Ids come from the URL; hash them so any string makes a valid cache key
+    return VERIFY_KEY.format(generation=generation, digest=hashlib.md5(certificate_id.encode()).hexdigest())
+
+
+def verification_queryset():
+    return Certificate.objects.select_related('enrollment__user', 'enrollment__course').only(
+        'certificate_id', 'issued_date', 'enrollment__completion_date', 'enrollment__user__username',
+        'enrollment__user__first_name', 'enrollment__user__last_name', 'enrollment__course__title',
+        'enrollment__course__slug',
+    )
+
+
+def to_verification(certificate):
+    enrollment = certificate.enrollment
+    return {
+        'certificate_id': str(certificate.certificate_id),
+        'valid': True,
+        'holder': enrollment.user.get_full_name() or enrollment.user.username,
+        'course': {'id': enrollment.course_id, 'title': enrollment.course.title, 'slug': enrollment.course.slug},
+        'issued_date': certificate.issued_date,
+        'completion_date': enrollment.completion_date,
+    }
+
+
+def not_found(certificate_id):
+    return {'certificate_id': certificate_id, 'valid': False}
+
+
+def verify(certificate_id):
+    key = verify_key(certificate_id, get_generation('certificate'))
+    result = cache.get(key)
+    if result is None:
+        certificate = verification_queryset().filter(certificate_id=certificate_id).first()
+        result = to_verification(certificate) if certificate else not_found(certificate_id)
+        cache.set(key, result, settings.CERTIFICATE_VERIFY_TIMEOUT)
+    return result
+
+
+def verify_many(certificate_ids):
+    """Verify up to BULK_VERIFY_LIMIT ids: one cache round trip, then one IN query for the misses"""
+    certificate_ids = list(dict.fromkeys(certificate_ids))
+    generation = get_generation('certificate')
+    keys = {certificate_id: verify_key(certificate_id, generation) for certificate_id in certificate_ids}
+    cached = cache.get_many(keys.values())
+    results = {certificate_id: cached[key] for certificate_id, key in keys.items() if key in cached}
+
+    missing = [certificate_id for certificate_id in certificate_ids if certificate_id not in results]
+    if missing:
+        found = {
+            certificate.certificate_id: to_verification(certificate)
+            for certificate in verification_queryset().filter(certificate_id__in=missing)
+        }
+        fresh = {certificate_id: found.get(certificate_id) or not_found(certificate_id) for certificate_id in missing}
+        cache.set_many({keys[certificate_id]: result for certificate_id, result in fresh.items()},
+                       settings.CERTIFICATE_VERIFY_TIMEOUT)
+        results.update(fresh)
+    return [results[certificate_id] for certificate_id in certificate_ids]
+
@@ -6,10 +6,12 @@ from django.contrib.auth.views import PasswordResetView, PasswordResetConfirmVie
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q, Avg
+from django.db.models import Q, Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_POST
 from django.template.loader import render_to_string
 from django.conf import settings
 import random
@@ -19,6 +21,20 @@ import json
 
 from .models import *
 from .forms import *
+from .dashboard import get_dashboard
+from .pagination import KeysetPaginator, KeysetListMixin
+from .search import get_search_backend, highlight
+from .facets import catalog_filters, apply_catalog_filters, get_facets
+from .pagecache import cache_anonymous_page
+from .conditional import course_detail_etag, course_list_etag, lesson_etag
+from .certificates import issue_certificate
+from .verification import verify
+from .quizzes import (
+    start_attempt, submit_attempt, is_overdue, expire, responses_from, attempt_questions, question_count,
+)
+from .item_analysis import refresh_quiz_stats, item_report
+from .jobs import enqueue
+from .outline import get_course_outline, copy_outline_modules, get_lesson_index, completed_lesson_ids
 
 
 # Authentication Views
@@ -79,6 +95,7 @@ class CustomPasswordResetConfirmView(PasswordResetConfirmView):
 
 
 # Home and Static Pages
+@cache_anonymous_page
 def home_view(request):
     courses = Course.objects.filter(is_active=True)[:6]  # Show 6 featured courses
     context = {
@@ -87,6 +104,7 @@ def home_view(request):
     return render(request, 'home.html', context)
 
 
+@cache_anonymous_page
 def about_view(request):
     return render(request, 'about.html')
 
@@ -104,42 +122,46 @@ def contact_view(request):
 
 
 # Course Views
-class CourseListView(ListView):
+@method_decorator(condition(etag_func=course_list_etag), name='get')
+class CourseListView(KeysetListMixin, ListView):
     model = Course
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
-    paginate_by = 12
+    keyset_per_page = 12
+    keyset_count_limit = 1000
+    anonymous_page_cache = True
+
+    def get_keyset_ordering(self):
+        # Search results keep their relevance order, the catalog is newest first
+        return ['-search_rank', '-id'] if self.search else ['-created_at', '-id']
 
     def get_queryset(self):
         queryset = Course.objects.filter(is_active=True)
-        category = self.request.GET.get('category')
-        level = self.request.GET.get('level')
-        search = self.request.GET.get('search')
-
-        if category:
-            queryset = queryset.filter(category=category)
-        if level:
-            queryset = queryset.filter(level=level)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(instructor__icontains=search)
-            )
+        self.filters = catalog_filters(self.request.GET)
+        self.search = self.request.GET.get('search', '').strip()
+
+        queryset = apply_catalog_filters(queryset, self.filters)
+        if self.search:
+            # Ranked full-text search (FTS5 on SQLite, tsvector on PostgreSQL)
+            queryset = get_search_backend().search(queryset, self.search)
 
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Course.objects.values_list('category', flat=True).distinct()
-        context['levels'] = [('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced')]
+        if self.search:
+            for course in context['courses']:
+                course.search_snippet_html = highlight(course.search_snippet)
+        context['facets'] = get_facets(self.filters, self.search)
         return context
 
 
+@method_decorator(condition(etag_func=course_detail_etag), name='get')
 class CourseDetailView(DetailView):
     model = Course
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
+    anonymous_page_cache = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -151,12 +173,17 @@ class CourseDetailView(DetailView):
             context['enrollment'] = enrollment
             context['is_enrolled'] = enrollment is not None
 
-        # Get reviews
-        context['reviews'] = Review.objects.filter(course=course)
-        context['average_rating'] = context['reviews'].aggregate(Avg('rating'))['rating__avg'] or 0
+        # Reviews, newest first and paged; the rating summary is stored on the course row
+        reviews_page = KeysetPaginator(
+            Review.objects.filter(course=course).select_related('user'), ['-created_at', '-id'], per_page=10,
+        ).page(self.request.GET.get('reviews'))
+        context['reviews'] = reviews_page.object_list
+        context['reviews_page'] = reviews_page
+        context['average_rating'] = course.average_rating
+        context['average_stars'] = round(course.average_rating)
 
-        # Get modules and lessons
-        context['modules'] = course.modules.filter(is_active=True).prefetch_related('lessons')
+        # Get modules and lessons from the cached outline
+        context['modules'] = get_course_outline(course)['modules']
 
         return context
 
@@ -184,41 +211,139 @@ def enroll_course(request, course_id):
 # Dashboard Views
 @login_required
 def dashboard_view(request):
-    enrollments = Enrollment.objects.filter(user=request.user).select_related('course')
-    completed_count = enrollments.filter(status='completed').count()
-    total_count = enrollments.filter(status='completed').count() + enrollments.filter(status='in_progress').count()
-    context = {
-        'enrollments': enrollments,
-        'completed_count': completed_count,
-        'total_count': total_count,
-    }
+    context = get_dashboard(request.user)
     return render(request, 'dashboard/dashboard.html', context)
 
 
 @login_required
 def course_progress_view(request, enrollment_id):
-    enrollment = get_object_or_404(Enrollment, id=enrollment_id, user=request.user)
+    enrollment = get_object_or_404(Enrollment.objects.select_related('course'), id=enrollment_id, user=request.user)
     course = enrollment.course
 
-    # Get all modules and lessons
-    modules = course.modules.filter(is_active=True).prefetch_related('lessons')
+    # Active modules and lessons from the cached outline
+    modules = copy_outline_modules(get_course_outline(course))
 
-    # Get user's progress
-    progress_records = Progress.objects.filter(enrollment=enrollment)
+    # Get user's progress keyed by lesson, in one query
+    progress_map = {
+        record.lesson_id: record
+        for record in Progress.objects.filter(enrollment=enrollment).only(
+            'id', 'lesson_id', 'is_completed', 'completed_at'
+        )
+    }
+    for module in modules:
+        module['completed_count'] = 0
+        for lesson in module['lessons']:
+            lesson['progress'] = progress_map.get(lesson['id'])
+            if lesson['progress'] and lesson['progress'].is_completed:
+                module['completed_count'] += 1
 
     context = {
         'enrollment': enrollment,
         'course': course,
         'modules': modules,
-        'progress_records': progress_records,
+        'progress_map': progress_map,
     }
     return render(request, 'dashboard/course_progress.html', context)
 
 
 @login_required
+def quiz_view(request, enrollment_id, quiz_id):
+    """Quiz introduction with the learner's past attempts; POST starts (or resumes) an attempt"""
+    enrollment = get_object_or_404(Enrollment.objects.select_related('course'), id=enrollment_id, user=request.user)
+    quiz = get_object_or_404(Quiz, id=quiz_id, module__course_id=enrollment.course_id, is_active=True)
+
+    if request.method == 'POST':
+        attempt = start_attempt(quiz, enrollment)
+        return redirect('quiz_attempt', attempt_id=attempt.id)
+
+    context = {
+        'enrollment': enrollment,
+        'course': enrollment.course,
+        'quiz': quiz,
+        'question_count': question_count(quiz),
+        'attempts': QuizAttempt.objects.filter(quiz=quiz, enrollment=enrollment).exclude(status='in_progress'),
+        'open_attempt': QuizAttempt.objects.filter(quiz=quiz, enrollment=enrollment, status='in_progress').first(),
+    }
+    return render(request, 'dashboard/quiz.html', context)
+
+
+@login_required
+def quiz_attempt_view(request, attempt_id):
+    """The questions of an open attempt, or the graded answers of a closed one"""
+    attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('quiz', 'enrollment__course'), id=attempt_id,
+        enrollment__user=request.user,
+    )
+    if attempt.status == 'in_progress' and is_overdue(attempt, timezone.now()):
+        expire(attempt, timezone.now())
+
+    answers = {}
+    if attempt.status != 'in_progress':
+        answers = {answer.question_id: answer for answer in attempt.answers.all()}
+    questions = [
+        {'question': question, 'options': options, 'answer': answers.get(question.id)}
+        for question, options in attempt_questions(attempt)
+    ]
+    context = {
+        'attempt': attempt,
+        'quiz': attempt.quiz,
+        'enrollment': attempt.enrollment,
+        'course': attempt.enrollment.course,
+        'questions': questions,
+        'seconds_left': max(int((attempt.deadline - timezone.now()).total_seconds()), 0) if attempt.deadline else None,
+    }
+    return render(request, 'dashboard/quiz_attempt.html', context)
+
+
+@login_required
+@require_POST
+def quiz_submit(request, attempt_id):
+    attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('quiz'), id=attempt_id, enrollment__user=request.user,
+    )
+    if not submit_attempt(attempt, responses_from(request.POST)):
+        messages.warning(request, 'This attempt was already submitted.')
+    elif attempt.status == 'expired':
+        messages.error(request, 'Time was up before your answers arrived, so this attempt was not scored.')
+    elif attempt.passed:
+        messages.success(request, f'You passed with {attempt.percentage}%!')
+    else:
+        messages.info(request, f'You scored {attempt.percentage}%. {attempt.quiz.passing_score}% is needed to pass.')
+    return redirect('quiz_attempt', attempt_id=attempt.id)
+
+
+@login_required
+def certificate_view(request, enrollment_id):
+    enrollment = get_object_or_404(
+        Enrollment.objects.select_related('course', 'user'), id=enrollment_id, user=request.user, status='completed',
+    )
+    # Completions from before certificates were issued automatically
+    certificate = Certificate.objects.filter(enrollment=enrollment).first() or issue_certificate(enrollment)
+    return render(request, 'certificate.html', {'enrollment': enrollment, 'certificate': certificate})
+
+
+def certificate_verify_view(request, certificate_id):
+    """Public page confirming whether a certificate id is genuine"""
+    result = verify(certificate_id)
+    return render(request, 'certificate_verify.html', {'result': result}, status=200 if result['valid'] else 404)
+
+
+def can_complete_lesson(enrollment, lesson, progress, index):
+    """Whether the learner may mark this lesson complete.
+
+    Completed courses can be reviewed freely; otherwise every earlier lesson
+    of the module must be completed first.
+    """
+    if enrollment.status == 'completed':
+        return not progress.is_completed
+    return index.can_complete(lesson.id, completed_lesson_ids(enrollment, index))
+
+
+@login_required
+@condition(etag_func=lesson_etag)
 def lesson_view(request, enrollment_id, lesson_id):
-    enrollment = get_object_or_404(Enrollment, id=enrollment_id, user=request.user)
-    lesson = get_object_or_404(Lesson, id=lesson_id, module__course=enrollment.course, is_active=True)
+    enrollment = get_object_or_404(Enrollment.objects.select_related('course'), id=enrollment_id, user=request.user)
+    lesson = get_object_or_404(Lesson, id=lesson_id, module__course_id=enrollment.course_id, is_active=True)
 
     # Get or create progress record for this lesson only
     progress, created = Progress.objects.get_or_create(
@@ -227,70 +352,25 @@ def lesson_view(request, enrollment_id, lesson_id):
         defaults={'is_completed': False}
     )
 
-    # For completed courses, allow access to all lessons for review
-    # For in-progress courses, check prerequisites
-    can_mark_complete = False
-    if enrollment.status == 'completed':
-        # Allow marking as complete for review purposes, but don't change progress
-        can_mark_complete = not progress.is_completed
-    else:
-        # For in-progress courses, check if this is the first lesson in module or previous are completed
-        if lesson.order == 0:  # First lesson in module
-            can_mark_complete = True
-        else:
-            # Check if all previous lessons in this module are completed
-            previous_lessons = Lesson.objects.filter(
-                module=lesson.module,
-                order__lt=lesson.order,
-                is_active=True
-            )
-            if previous_lessons.exists():
-                completed_previous = Progress.objects.filter(
-                    enrollment=enrollment,
-                    lesson__in=previous_lessons,
-                    is_completed=True
-                ).count()
-                can_mark_complete = completed_previous == previous_lessons.count()
-            else:
-                can_mark_complete = True
+    index = get_lesson_index(enrollment.course)
+    can_mark_complete = can_complete_lesson(enrollment, lesson, progress, index)
 
     if request.method == 'POST' and 'mark_complete' in request.POST:
         if can_mark_complete:
-            progress.is_completed = True
-            progress.completed_at = timezone.now()
-            progress.save()
-
-            # Only update enrollment progress if course is not already completed
-            if enrollment.status != 'completed':
-                enrollment.update_progress()
+            enrollment.complete_lesson(progress)
 
             messages.success(request, f'Lesson "{lesson.title}" marked as completed!')
 
             # Redirect to next lesson or course progress
-            next_lesson = Lesson.objects.filter(
-                module=lesson.module,
-                order__gt=lesson.order,
-                is_active=True
-            ).first()
-
+            next_lesson = index.next_in_module(lesson.id)
             if next_lesson:
                 return redirect('lesson_view', enrollment_id=enrollment_id, lesson_id=next_lesson.id)
             else:
                 return redirect('course_progress', enrollment_id=enrollment_id)
 
-    # Get next lesson in the same module
-    next_lesson = Lesson.objects.filter(
-        module=lesson.module,
-        order__gt=lesson.order,
-        is_active=True
-    ).first()
-
-    # Get previous lesson in the same module
-    previous_lesson = Lesson.objects.filter(
-        module=lesson.module,
-        order__lt=lesson.order,
-        is_active=True
-    ).last()
+    # Neighbouring lessons in the same module
+    next_lesson = index.next_in_module(lesson.id)
+    previous_lesson = index.previous_in_module(lesson.id)
 
     context = {
         'enrollment': enrollment,
@@ -320,6 +400,12 @@ def profile_view(request):
 
 
 # Admin Views
+def count_subquery(queryset, group_by):
+    """Correlated COUNT(*) for annotations, without joining rows into the outer query"""
+    counts = queryset.order_by().values(group_by).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
 class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_superuser
@@ -333,26 +419,43 @@ def admin_user_management(request):
         return redirect('home')
 
     from django.contrib.auth.models import User
-    users = User.objects.all().order_by('-date_joined')
-    user_profiles = UserProfile.objects.all().select_related('user')
-
-    # Get enrollment stats for each user
-    user_stats = {}
-    for user in users:
-        enrollments = Enrollment.objects.filter(user=user)
-        user_stats[user.id] = {
-            'total_enrollments': enrollments.count(),
-            'completed_courses': enrollments.filter(status='completed').count(),
-            'in_progress_courses': enrollments.filter(status='in_progress').count(),
-        }
+    users = User.objects.select_related('userprofile').annotate(
+        total_enrollments=Count('enrollment'),
+        completed_courses=Count('enrollment', filter=Q(enrollment__status='completed')),
+        in_progress_courses=Count('enrollment', filter=Q(enrollment__status='in_progress')),
+    )
+
+    # Server-side search and filters
+    search = request.GET.get('search', '').strip()
+    is_active = request.GET.get('is_active')
+    is_superuser = request.GET.get('is_superuser')
+    if search:
+        users = users.filter(
+            Q(username__icontains=search) |
+            Q(email__icontains=search) |
+            Q(userprofile__college__icontains=search)
+        )
+    if is_active in ('0', '1'):
+        users = users.filter(is_active=is_active == '1')
+    if is_superuser in ('0', '1'):
+        users = users.filter(is_superuser=is_superuser == '1')
+
+    page = KeysetPaginator(users, ['-date_joined', '-id'], per_page=50).page(request.GET.get('cursor'))
+
+    totals = User.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active=True)),
+        admin_users=Count('id', filter=Q(is_superuser=True)),
+    )
 
     context = {
-        'users': users,
-        'user_profiles': user_profiles,
-        'user_stats': user_stats,
-        'total_users': users.count(),
-        'active_users': users.filter(is_active=True).count(),
-        'admin_users': users.filter(is_superuser=True).count(),
+        'users': page.object_list,
+        'page': page,
+        'search': search,
+        'is_active': is_active,
+        'is_superuser': is_superuser,
+        'regular_users': totals['total_users'] - totals['admin_users'],
+        **totals,
     }
     return render(request, 'admin/user_management.html', context)
 
@@ -535,12 +638,20 @@ def admin_course_management(request):
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('home')
 
-    courses = Course.objects.all().order_by('-created_at')
+    courses = Course.objects.annotate(
+        task_count=count_subquery(Task.objects.filter(module__course=OuterRef('pk')), 'module__course'),
+        enrollment_count=count_subquery(Enrollment.objects.filter(course=OuterRef('pk')), 'course'),
+    )
+    page = KeysetPaginator(courses, ['-created_at', '-id'], per_page=20).page(request.GET.get('cursor'))
+    totals = Course.objects.aggregate(
+        total_courses=Count('id'),
+        active_courses=Count('id', filter=Q(is_active=True)),
+        inactive_courses=Count('id', filter=Q(is_active=False)),
+    )
     context = {
-        'courses': courses,
-        'total_courses': courses.count(),
-        'active_courses': courses.filter(is_active=True).count(),
-        'inactive_courses': courses.filter(is_active=False).count(),
+        'courses': page.object_list,
+        'page': page,
+        **totals,
     }
     return render(request, 'admin/course_management.html', context)
 
@@ -575,17 +686,25 @@ def admin_course_detail(request, course_id):
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('home')
 
-    course = get_object_or_404(Course, id=course_id)
-    modules = course.modules.all().order_by('order')
-    discussions = course.discussions.all().order_by('-created_at')[:10]
+    course = get_object_or_404(Course.objects.annotate(
+        enrollment_count=count_subquery(Enrollment.objects.filter(course=OuterRef('pk')), 'course'),
+    ), id=course_id)
+    modules = list(course.modules.select_related('quiz').prefetch_related('tasks').annotate(
+        task_count=Count('tasks'),
+    ).order_by('order'))
+    discussions_page = KeysetPaginator(
+        course.discussions.select_related('user').annotate(reply_count=Count('replies')),
+        ['-created_at', '-id'], per_page=10,
+    ).page(request.GET.get('discussions'))
 
     context = {
         'course': course,
         'modules': modules,
-        'discussions': discussions,
-        'total_modules': modules.count(),
-        'total_tasks': sum(module.tasks.count() for module in modules),
-        'total_enrollments': Enrollment.objects.filter(course=course).count(),
+        'discussions': discussions_page.object_list,
+        'discussions_page': discussions_page,
+        'total_modules': len(modules),
+        'total_tasks': sum(module.task_count for module in modules),
+        'total_enrollments': course.enrollment_count,
     }
     return render(request, 'admin/course_detail.html', context)
 
@@ -656,6 +775,7 @@ def admin_task_create(request, module_id):
         if form.is_valid():
             task = form.save(commit=False)
             task.module = module
+            form.attach_upload(task, request.user)
             task.save()
             messages.success(request, f'Task "{task.title}" created successfully!')
             return redirect('admin_course_detail', course_id=course.id)
@@ -734,6 +854,27 @@ def admin_quiz_questions(request, quiz_id):
     return render(request, 'admin/quiz_questions.html', context)
 
 
+def admin_quiz_stats(request, quiz_id):
+    """Item analysis of a quiz; POST folds in the attempts submitted since the last refresh"""
+    if not request.user.is_superuser:
+        messages.error(request, 'Access denied. Admin privileges required.')
+        return redirect('home')
+
+    quiz = get_object_or_404(Quiz.objects.select_related('module__course'), id=quiz_id)
+    if request.method == 'POST':
+        added = refresh_quiz_stats(quiz, rebuild=request.POST.get('rebuild') == '1')
+        messages.success(request, f'Stats refreshed: {added} new attempt(s) analyzed.')
+        return redirect('admin_quiz_stats', quiz_id=quiz.id)
+
+    context = {
+        'quiz': quiz,
+        'course': quiz.module.course,
+        'stats': QuizStats.objects.filter(quiz=quiz).first(),
+        'items': item_report(quiz),
+    }
+    return render(request, 'admin/quiz_stats.html', context)
+
+
 class CourseCreateView(AdminRequiredMixin, CreateView):
     model = Course
     form_class = CourseForm
@@ -766,11 +907,11 @@ class CourseDeleteView(AdminRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-class AdminCourseListView(AdminRequiredMixin, ListView):
+class AdminCourseListView(AdminRequiredMixin, KeysetListMixin, ListView):
     model = Course
     template_name = 'admin/course_list.html'
     context_object_name = 'courses'
-    paginate_by = 20
+    keyset_per_page = 20
 
 
 # API-like views for AJAX requests
@@ -779,8 +920,8 @@ def mark_lesson_complete(request, enrollment_id, lesson_id):
         return JsonResponse({'error': 'Authentication required'}, status=401)
 
     try:
-        enrollment = Enrollment.objects.get(id=enrollment_id, user=request.user)
-        lesson = Lesson.objects.get(id=lesson_id, module__course=enrollment.course)
+        enrollment = Enrollment.objects.select_related('course').get(id=enrollment_id, user=request.user)
+        lesson = Lesson.objects.get(id=lesson_id, module__course_id=enrollment.course_id)
 
         progress, created = Progress.objects.get_or_create(
             enrollment=enrollment,
@@ -788,75 +929,12 @@ def mark_lesson_complete(request, enrollment_id, lesson_id):
             defaults={'is_completed': False}
         )
 
-        # Check if lesson can be marked complete (same logic as lesson_view)
-        can_mark_complete = False
-        if enrollment.status == 'completed':
-            # Allow marking as complete for review purposes
-            can_mark_complete = not progress.is_completed
-        else:
-            # For in-progress courses, check prerequisites
-            if lesson.order == 0:  # First lesson in module
-                can_mark_complete = True
-            else:
-                # Check if all previous lessons in this module are completed
-                previous_lessons = Lesson.objects.filter(
-                    module=lesson.module,
-                    order__lt=lesson.order,
-                    is_active=True
-                )
-                if previous_lessons.exists():
-                    completed_previous = Progress.objects.filter(
-                        enrollment=enrollment,
-                        lesson__in=previous_lessons,
-                        is_completed=True
-                    ).count()
-                    can_mark_complete = completed_previous == previous_lessons.count()
-                else:
-                    can_mark_complete = True
-
-        if not progress.is_completed and can_mark_complete:
-            progress.is_completed = True
-            progress.completed_at = timezone.now()
-            progress.save()
-
-            # Only update enrollment progress if course is not already completed
-            if enrollment.status != 'completed':
-                # Update progress with precise calculation to prevent bulk completion
-                total_lessons = enrollment.course.get_total_lessons()
-                completed_lessons = Progress.objects.filter(
-                    enrollment=enrollment,
-                    is_completed=True
-                ).count()
-
-                # Calculate progress with high precision to avoid rounding errors
-                if total_lessons > 0:
-                    progress_percentage = round((completed_lessons / total_lessons) * 100, 6)
-                else:
-                    progress_percentage = 100.00
-
-                enrollment.progress_percentage = progress_percentage
-                enrollment.save()
-
-                # Only mark as completed when exactly 100% (prevent bulk completion)
-                if progress_percentage >= 100.00 and enrollment.status != 'completed':
-                    enrollment.status = 'completed'
-                    enrollment.completion_date = timezone.now()
-                    enrollment.save()
-                elif progress_percentage > 0 and enrollment.status == 'enrolled':
-                    enrollment.status = 'in_progress'
-                    enrollment.save()
-
-                print(f"DEBUG: Lesson {lesson.id} marked complete for enrollment {enrollment.id}")
-                print(f"DEBUG: Total lessons: {total_lessons}")
-                print(f"DEBUG: Completed lessons: {completed_lessons}")
-                print(f"DEBUG: Progress percentage: {progress_percentage}")
+        index = get_lesson_index(enrollment.course)
+        if can_complete_lesson(enrollment, lesson, progress, index):
+            enrollment.complete_lesson(progress)
 
         # Get next lesson URL
-        next_lesson = Lesson.objects.filter(
-            module=lesson.module,
-            order__gt=lesson.order,
-            is_active=True
-        ).first()
+        next_lesson = index.next_in_module(lesson.id)
 
         next_lesson_url = None
         if next_lesson:
@@ -879,7 +957,7 @@ def send_otp_email(user, otp):
     """Send OTP email to user"""
     subject = 'FUTURE BOUND TECH - Email Verification'
     message = f'Your verification code is: {otp}'
-    from_email = settings.DEFAULT_FROM_EMAIL
-    recipient_list = [user.email]
-
-    send_mail(subject, message, from_email, recipient_list)
+    # Queued ahead of bulk mail so codes arrive while the user is waiting
+    enqueue('send_email', {
+        'subject': subject, 'body': message, 'to': [user.email], 'from_email': settings.DEFAULT_FROM_EMAIL,
+    }, priority=10)
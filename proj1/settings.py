@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'App2.pagecache.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -110,6 +112,64 @@ DATABASES = {
 }
 
 
+# Cache
+# Local memory per worker by default. Point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache (e.g. django.core.cache.backends.db.DatabaseCache after `createcachetable`,
+# or memcached) to share entries between gunicorn workers. Course outlines are keyed
+# by Course.outline_version, so either setup stays coherent.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'edu-pro'),
+    }
+}
+
+# Seconds to cache each learner's dashboard; 0 disables. Needs a shared cache with
+# several workers, since invalidation only reaches the cache this process uses.
+DASHBOARD_SNAPSHOT_TIMEOUT = int(os.environ.get('DASHBOARD_SNAPSHOT_TIMEOUT', 0))
+# Catalog facet counts are cached per filter combination and dropped on any Course
+# save/delete. With per-process memory other workers only see a change once their
+# entries time out, so keep this short unless the cache is shared. 0 disables it.
+CATALOG_FACETS_TIMEOUT = int(os.environ.get('CATALOG_FACETS_TIMEOUT', 300))
+# Anonymous full-page cache for home, about and the course pages. Entries are keyed
+# by generation counters stored in the database, so changes show up immediately in
+# every worker. 0 disables it.
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 600))
+# JSON API responses for the catalog and course detail, keyed the same way. 0 disables it.
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+# Background jobs (emails, image derivatives) are stored in the Job table and run by
+# `manage.py run_workers`. Where no worker process can run (Vercel), JOBS_EAGER runs
+# each job in the request right after its transaction commits instead. Outside Vercel
+# it defaults to off: without a running worker, OTP and password reset emails are
+# queued but never sent (enqueue logs an error once jobs sit unclaimed).
+JOBS_EAGER = os.environ.get('JOBS_EAGER', 'true' if os.environ.get('VERCEL') else 'false').lower() == 'true'
+# First retry delay in seconds; doubles on each failed attempt (capped at an hour).
+JOBS_BACKOFF_SECONDS = int(os.environ.get('JOBS_BACKOFF_SECONDS', 10))
+# Finished jobs are purged by the workers after this many days.
+JOBS_RETENTION_DAYS = int(os.environ.get('JOBS_RETENTION_DAYS', 7))
+# Lesson and task files are served by /content/... views that check enrollment. Set
+# PROTECTED_MEDIA_SERVER to 'nginx' (X-Accel-Redirect to PROTECTED_MEDIA_INTERNAL_URL,
+# which must be an `internal` location aliased to MEDIA_ROOT) or 'sendfile' (X-Sendfile
+# for Apache/lighttpd) to let the proxy send the bytes; empty streams them from Django.
+PROTECTED_MEDIA_SERVER = os.environ.get('PROTECTED_MEDIA_SERVER', '')
+PROTECTED_MEDIA_INTERNAL_URL = os.environ.get('PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+PROTECTED_MEDIA_CHUNK_SIZE = 64 * 1024
+# Certificate files are stored per template version; bump it after changing the design
+# in App2/certificates.py and run `manage.py render_certificates` to re-render them all.
+CERTIFICATE_TEMPLATE_VERSION = 1
+# Seconds to cache each certificate verification answer, found or not found. Answers
+# are keyed by a database generation, so certificate changes apply immediately.
+CERTIFICATE_VERIFY_TIMEOUT = int(os.environ.get('CERTIFICATE_VERIFY_TIMEOUT', 3600))
+# Quiz submissions arriving this many seconds after the time limit are still graded.
+QUIZ_SUBMIT_GRACE_SECONDS = 30
+# Large lesson/task files are uploaded in chunks into CHUNKED_UPLOAD_DIR, which every
+# web process must share, then moved into media storage. Keep chunks under the host's
+# request size limit (4.5 MB on Vercel). `manage.py purge_uploads` drops stale sessions.
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'edu_pro_uploads'))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get('CHUNKED_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024))
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 5 * 1024 ** 3))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,125 @@
+// Resumable chunked uploads for large content files (server side: App2/uploads.py).
+// A file input with data-chunked-upload="<target>" is uploaded in chunks as soon
+// as a file is picked; the session id goes into the form's content_upload field
+// and the input is cleared so the form post stays small. Picking the same file
+// again after an interruption resumes from the offset the server has.
+(function () {
+    function csrfToken(form) {
+        return form.querySelector('[name=csrfmiddlewaretoken]').value;
+    }
+
+    function hex(buffer) {
+        return Array.from(new Uint8Array(buffer), function (b) {
+            return b.toString(16).padStart(2, '0');
+        }).join('');
+    }
+
+    async function request(url, options, form) {
+        options.headers = Object.assign({'X-CSRFToken': csrfToken(form)}, options.headers || {});
+        options.credentials = 'same-origin';
+        const response = await fetch(url, options);
+        const data = response.status === 204 ? {} : await response.json();
+        return {ok: response.ok, status: response.status, data: data};
+    }
+
+    async function openSession(input, file, form) {
+        const key = 'chunked-upload:' + [input.dataset.chunkedUpload, file.name, file.size, file.lastModified].join(':');
+        const saved = localStorage.getItem(key);
+        if (saved) {
+            const state = await request(input.dataset.uploadUrl + saved + '/', {method: 'GET'}, form);
+            if (state.ok) {
+                return {key: key, state: state.data};
+            }
+        }
+        const created = await request(input.dataset.uploadUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({filename: file.name, size: file.size, target: input.dataset.chunkedUpload}),
+        }, form);
+        if (!created.ok) {
+            throw new Error(created.data.error || 'Could not start the upload');
+        }
+        localStorage.setItem(key, created.data.id);
+        return {key: key, state: created.data};
+    }
+
+    async function upload(input, file, form, progress) {
+        const session = await openSession(input, file, form);
+        let state = session.state;
+        const url = input.dataset.uploadUrl + state.id + '/';
+        let failures = 0;
+        while (state.status === 'uploading' && state.offset < state.size) {
+            const chunk = file.slice(state.offset, state.offset + state.chunk_size);
+            const body = await chunk.arrayBuffer();
+            const digest = hex(await crypto.subtle.digest('SHA-256', body));
+            let result;
+            try {
+                result = await request(url, {
+                    method: 'PATCH',
+                    headers: {
+                        'Content-Type': 'application/offset+octet-stream',
+                        'Upload-Offset': String(state.offset),
+                        'Upload-Checksum': 'sha256 ' + digest,
+                    },
+                    body: body,
+                }, form);
+            } catch (networkError) {
+                result = {ok: false, status: 0, data: {}};
+            }
+            if (result.ok || result.status === 409) {
+                // 409 carries the offset the server actually has
+                state = Object.assign(state, result.data);
+                failures = 0;
+            } else if (++failures > 5) {
+                throw new Error(result.data.error || 'Upload interrupted; pick the file again to resume');
+            } else {
+                await new Promise(function (resolve) { setTimeout(resolve, 1000 * 2 ** failures); });
+            }
+            progress(state.offset / state.size);
+        }
+        if (state.status !== 'complete') {
+            const completed = await request(url + 'complete/', {method: 'POST'}, form);
+            if (!completed.ok) {
+                throw new Error(completed.data.error || 'Could not finish the upload');
+            }
+        }
+        localStorage.removeItem(session.key);
+        return state.id;
+    }
+
+    document.querySelectorAll('input[type=file][data-chunked-upload]').forEach(function (input) {
+        const form = input.form;
+        const hidden = form.querySelector('[name=content_upload]');
+        const status = document.createElement('div');
+        status.className = 'form-text text-cyan';
+        input.insertAdjacentElement('afterend', status);
+        let pending = null;
+
+        input.addEventListener('change', function () {
+            const file = input.files[0];
+            hidden.value = '';
+            if (!file) {
+                return;
+            }
+            status.textContent = 'Uploading ' + file.name + '…';
+            pending = upload(input, file, form, function (fraction) {
+                status.textContent = 'Uploading ' + file.name + '… ' + Math.floor(fraction * 100) + '%';
+            }).then(function (id) {
+                hidden.value = id;
+                input.value = '';
+                status.textContent = file.name + ' uploaded.';
+            }).catch(function (error) {
+                status.textContent = error.message;
+            }).finally(function () {
+                pending = null;
+            });
+        });
+
+        form.addEventListener('submit', function (event) {
+            if (pending) {
+                event.preventDefault();
+                alert('Please wait for the file upload to finish.');
+            }
+        });
+    });
+})();